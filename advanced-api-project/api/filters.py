@@ -1,18 +1,33 @@
 # api/filters.py
 import django_filters
-from .models import Book
+from .models import AuthorNameGram, Book, BookTitleGram
 
 class BookFilter(django_filters.FilterSet):
     """
     Custom filter set for the Book model.
     Allows filtering by title (case-insensitive contains),
     publication_year (exact match), and author name (case-insensitive contains).
+
+    Substring searches of three or more characters are answered from the
+    trigram tables (see ``models.SearchGram``) and then confirmed with
+    ``icontains``; shorter terms have no trigram and fall back to a plain
+    ``icontains`` scan.
     """
-    title = django_filters.CharFilter(lookup_expr='icontains')
+    title = django_filters.CharFilter(method='filter_title')
     publication_year = django_filters.NumberFilter(lookup_expr='exact')
     # Filter by author name, linking through the 'author' ForeignKey
-    author_name = django_filters.CharFilter(field_name='author__name', lookup_expr='icontains')
+    author_name = django_filters.CharFilter(method='filter_author_name')
 
     class Meta:
         model = Book
-        fields = ['title', 'publication_year', 'author', 'author_name']
\ No newline at end of file
+        fields = ['title', 'publication_year', 'author', 'author_name']
+
+    def filter_title(self, queryset, name, value):
+        if len(value) >= 3:
+            queryset = queryset.filter(pk__in=BookTitleGram.items_containing(value))
+        return queryset.filter(title__icontains=value)
+
+    def filter_author_name(self, queryset, name, value):
+        if len(value) >= 3:
+            queryset = queryset.filter(author__in=AuthorNameGram.items_containing(value))
+        return queryset.filter(author__name__icontains=value)
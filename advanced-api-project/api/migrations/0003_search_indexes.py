@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def backfill_search_grams(apps, schema_editor):
+    for model_name, gram_name, source in [
+        ("Book", "BookTitleGram", "title"),
+        ("Author", "AuthorNameGram", "name"),
+    ]:
+        Gram = apps.get_model("api", gram_name)
+        rows = apps.get_model("api", model_name).objects.values_list("pk", source).iterator()
+        Gram.objects.bulk_create(
+            (Gram(item_id=pk, gram=gram) for pk, text in rows for gram in trigrams(text)),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_book_year_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorNameGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookTitleGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['id'], name='api_book_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publication_year', 'author'], name='api_book_year_author_idx'),
+        ),
+        migrations.AddField(
+            model_name='authornamegram',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.author'),
+        ),
+        migrations.AddField(
+            model_name='booktitlegram',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.book'),
+        ),
+        migrations.AddConstraint(
+            model_name='authornamegram',
+            constraint=models.UniqueConstraint(fields=('gram', 'item'), name='api_authornamegram_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='booktitlegram',
+            constraint=models.UniqueConstraint(fields=('gram', 'item'), name='api_booktitlegram_uniq'),
+        ),
+        migrations.RunPython(backfill_search_grams, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,12 @@
+from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
+
+
+def trigrams(text):
+    """The distinct lower-cased three-character substrings of ``text``."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
 
 
 class Author(models.Model):
@@ -11,6 +19,12 @@ class Author(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "name" in update_fields:
+            AuthorNameGram.index([self])
+
 class Book(models.Model):
     """
     Model representing a single book.
@@ -30,6 +44,93 @@ class Book(models.Model):
         on_delete=models.CASCADE,
         null=True # Allow null temporarily if running makemigrations on existing data
     )
+    # Only published books are listed by BookListView
+    is_published = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # Backs the publication_year ordering of BookCursorPagination
+            models.Index(fields=["publication_year", "id"], name="api_book_year_id_idx"),
+            # The default (id) ordering of BookListView reads published books only
+            models.Index(fields=["id"], condition=Q(is_published=True), name="api_book_published_idx"),
+            # BookFilter: publication_year, alone or with author
+            models.Index(fields=["publication_year", "author"], name="api_book_year_author_idx"),
+            # BookFilter: author, under the publication_year ordering
+            models.Index(fields=["author", "publication_year", "id"], name="api_book_author_year_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.publication_year})"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "title" in update_fields:
+            BookTitleGram.index([self])
+
+
+class SearchGram(models.Model):
+    """
+    One trigram of a searched text, so that substring search (``icontains``)
+    can be answered from an index: a row whose text contains the search term
+    has every trigram of the term (see ``api.filters.BookFilter``).
+
+    Subclasses add the ``item`` foreign key and are kept in sync through
+    ``index()``. Model ``save()`` does so; bulk writes must call it
+    themselves.
+    """
+    source = None  # the indexed attribute of the item
+
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def index(cls, items, replace=True):
+        """(Re)write the trigrams of ``items``; ``replace=False`` for new rows."""
+        if replace:
+            cls.objects.filter(item__in=items).delete()
+        cls.objects.bulk_create([
+            cls(item=item, gram=gram)
+            for item in items
+            for gram in trigrams(getattr(item, cls.source))
+        ])
+
+    @classmethod
+    def items_containing(cls, term):
+        """
+        Subquery of the ids of the items whose text has every trigram of
+        ``term`` (``term`` needs at least three characters). That is a
+        superset of the items containing ``term``.
+        """
+        grams = trigrams(term)
+        return (
+            cls.objects.filter(gram__in=grams)
+            .values("item")
+            .annotate(matched=models.Count("gram"))
+            .filter(matched=len(grams))
+            .values("item")
+        )
+
+
+class BookTitleGram(SearchGram):
+    source = "title"
+
+    item = models.ForeignKey(Book, related_name="+", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["gram", "item"], name="api_booktitlegram_uniq"),
+        ]
+
+
+class AuthorNameGram(SearchGram):
+    source = "name"
+
+    item = models.ForeignKey(Author, related_name="+", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["gram", "item"], name="api_authornamegram_uniq"),
+        ]
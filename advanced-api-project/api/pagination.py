@@ -0,0 +1,129 @@
+# api/pagination.py
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class AuthorPagination(PageNumberPagination):
+    """
+    Pages of authors. Each page costs the same three queries (count, authors,
+    their nested books) whatever its size.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class BookCursorPagination(CursorPagination):
+    """
+    Keyset pages of books: each page is one query that seeks into an index
+    and reads at most ``page_size + 1`` rows, however deep the page is.
+
+    The ``?ordering=`` chosen through ``OrderingFilter`` is mapped onto one of
+    ``KEYSETS``, each backed by an index (``api_book_published_idx`` or
+    ``api_book_year_id_idx``) and ending in ``id`` so that positions are
+    unique. The cursor therefore never needs DRF's offset, and a position
+    is the whole key (``"1999|42"``), filtered on as
+    ``year >= 1999 AND (year > 1999 OR id > 42)``.
+
+    Pages may be built from model instances, dicts or named ``values_list``
+    rows (the ``BookListView`` fast path).
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("id",)
+
+    # First ordering term -> the full, indexed key it is paginated by.
+    KEYSETS = {
+        "id": ("id",),
+        "-id": ("-id",),
+        "publication_year": ("publication_year", "id"),
+        "-publication_year": ("-publication_year", "-id"),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        try:
+            return self.KEYSETS[ordering[0]]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} cannot paginate by {ordering[0]!r}; "
+                f"limit ordering_fields to {sorted(self.KEYSETS)}."
+            )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = None if self.cursor is None else self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, self._decode_position(position)))
+
+        # One extra row tells whether there is anything beyond this page.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        # On an empty page (the rows around the cursor were deleted) both
+        # links fall back to the position we came from.
+        self.next_position = self.previous_position = position
+        if self.page:
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip("-")
+            values.append(instance[name] if isinstance(instance, dict) else getattr(instance, name))
+        return "|".join(str(value) for value in values)
+
+    def _decode_position(self, position):
+        try:
+            values = [int(value) for value in position.split("|")]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _after(self, ordering, values):
+        """Rows strictly after ``values`` in ``ordering``, as an index-friendly range."""
+        order, *rest = ordering
+        name = order.lstrip("-")
+        descending = order.startswith("-")
+        past = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[0]})
+        if not rest:
+            return past
+        reached = Q(**{f"{name}__{'lte' if descending else 'gte'}": values[0]})
+        return reached & (past | self._after(rest, values[1:]))
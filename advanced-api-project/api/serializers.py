@@ -1,5 +1,11 @@
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from django.utils.http import urlencode
 from rest_framework import serializers
-from .models import Author, Book
+from rest_framework.settings import api_settings
+from .models import Author, Book, BookTitleGram
 import datetime
 
 
@@ -20,13 +26,148 @@ class BookSerializer(serializers.ModelSerializer):
         return value
 
 
+BULK_MAX_BOOKS = 1000  # items per bulk request
+
+
+class BookListSerializer(serializers.ListSerializer):
+    """
+    Bulk writes of books through ``BookBulkSerializer(many=True)``.
+    All items are validated first, their authors are checked with one query,
+    and then every row is written with a single ``bulk_create`` or
+    ``bulk_update``, plus one write of the title trigrams. For updates,
+    ``instance`` is the list of books in the same order as the items.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", BULK_MAX_BOOKS)
+        super().__init__(*args, **kwargs)
+
+    def validate(self, attrs):
+        author_ids = {item["author_id"] for item in attrs if "author_id" in item}
+        known = set(Author.objects.filter(pk__in=author_ids).values_list("pk", flat=True))
+        message = serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+        errors = {
+            index: {"author": [message.format(pk_value=item["author_id"])]}
+            for index, item in enumerate(attrs)
+            if "author_id" in item and item["author_id"] not in known
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        books = Book.objects.bulk_create([Book(**attrs) for attrs in validated_data])
+        BookTitleGram.index(books, replace=False)
+        return books
+
+    def update(self, instance, validated_data):
+        fields = set()
+        for book, attrs in zip(instance, validated_data):
+            for name, value in attrs.items():
+                setattr(book, name, value)
+            fields.update(attrs)
+        if fields:
+            Book.objects.bulk_update(instance, sorted(fields))
+        if "title" in fields:
+            BookTitleGram.index([book for book, attrs in zip(instance, validated_data) if "title" in attrs])
+        return instance
+
+
+class BookBulkSerializer(BookSerializer):
+    """
+    BookSerializer for the bulk endpoints. ``author`` is taken as a plain id
+    and checked for the whole list at once by BookListSerializer, instead of
+    one lookup per book.
+    """
+    author = serializers.IntegerField(source="author_id")
+
+    class Meta(BookSerializer.Meta):
+        list_serializer_class = BookListSerializer
+
+
+class BookIdsSerializer(serializers.Serializer):
+    """The ids of the books a bulk request changes, each given once."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BULK_MAX_BOOKS)
+
+    def validate_ids(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Each book may only be given once.")
+        return value
+
+
 class AuthorSerializer(serializers.ModelSerializer):
     """
     Serializes the Author model with nested BookSerializer.
-    Provides a list of books authored by the given Author.
+    Provides the author's latest published books (a bounded number, see
+    ``views.author_queryset``), how many there are in total, and a link to
+    the full list. Expects that queryset, which prefetches ``top_books`` and
+    annotates ``book_count``.
     """
-    books = BookSerializer(many=True, read_only=True)
+    books = BookSerializer(many=True, read_only=True, source="top_books")
+    book_count = serializers.IntegerField(read_only=True)
+    books_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Author
-        fields = ["id", "name", "books"]
+        fields = ["id", "name", "book_count", "books", "books_url"]
+
+    def get_books_url(self, author):
+        url = f"{reverse('book-list')}?{urlencode({'author': author.pk})}"
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class ValuesProjection:
+    """
+    Read-only fast path for a ModelSerializer whose fields are plain columns.
+
+    Instead of building a model instance per row and walking its serializer
+    fields, rows are fetched with ``values_list(named=True)`` for exactly the
+    declared fields and zipped into dicts in declaration order (the names let
+    ``BookCursorPagination`` read a row's position). For the field types
+    below ``to_representation`` returns the database value unchanged, so the
+    rendered JSON is byte-identical to the serializer's own output.
+    """
+    # Exact types only: a subclass may override to_representation.
+    SUPPORTED_FIELDS = (
+        serializers.IntegerField,
+        serializers.BigIntegerField,
+        serializers.CharField,
+        serializers.BooleanField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer_class):
+        if serializer_class.to_representation is not serializers.ModelSerializer.to_representation:
+            raise ImproperlyConfigured(f"{serializer_class.__name__} customises to_representation.")
+        self.names = []
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if type(field) not in self.SUPPORTED_FIELDS or "." in field.source or field.source == "*":
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} ({type(field).__name__}) is not a plain column."
+                )
+            if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} uses a pk_field.")
+            if isinstance(field, serializers.BigIntegerField) and getattr(
+                field, "coerce_to_string", api_settings.COERCE_BIGINT_TO_STRING
+            ):
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} is rendered as a string.")
+            self.names.append(name)
+            # For a foreign key, values_list("author") yields the author's id.
+            self.columns.append(field.source)
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.columns, named=True)
+
+    def to_representation(self, rows):
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def projection_for(serializer_class):
+    """The (cached) ValuesProjection of ``serializer_class``."""
+    return ValuesProjection(serializer_class)
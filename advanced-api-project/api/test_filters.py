@@ -0,0 +1,127 @@
+import re
+from itertools import combinations
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from .models import Author, AuthorNameGram, Book, BookTitleGram
+
+# "SCAN api_book" reads the whole table; "SCAN api_book USING INDEX ..." walks
+# an index in order (and stops once the page is full), which is fine.
+FULL_SCAN = re.compile(r"\bSCAN (\w+)\b(?! USING (COVERING )?INDEX)")
+# A temp B-tree for ORDER BY or DISTINCT sorts every matching row before the
+# first page can be returned. (The GROUP BY of a trigram search only sorts
+# the postings of the term's grams.)
+FULL_SORT = re.compile(r"\bUSE TEMP B-TREE FOR (ORDER BY|DISTINCT)\b")
+SEARCH_FILTERS = {"title", "author_name"}
+
+
+def query_plan(sql, params=()):
+    """The detail lines of SQLite's ``EXPLAIN QUERY PLAN`` for ``sql``."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTests(APITestCase):
+    """
+    Every filter combination BookFilter supports, under every ordering
+    BookCursorPagination allows, must be answered without a full table scan,
+    on the first page and the next, and without sorting all the matching
+    rows. Two exceptions: search terms shorter than a trigram are matched
+    by scanning, and trigram searches sort the books that match the term,
+    since no index can return an arbitrary set of ids in order.
+    """
+    FILTERS = ["title", "publication_year", "author", "author_name"]
+    ORDERINGS = ["id", "-id", "publication_year", "-publication_year"]
+
+    def setUp(self):
+        self.author = Author.objects.create(name="Ada Lovelace")
+        for i in range(3):
+            Book.objects.create(title=f"Notes on the engine {i}", publication_year=1843, author=self.author)
+        Book.objects.create(title="Draft", publication_year=1843, author=self.author, is_published=False)
+
+    def assertNoFullScan(self, queries, label, sorts=False):
+        for query in queries:
+            for line in query_plan(query["sql"]):
+                self.assertIsNone(FULL_SCAN.search(line), f"{label}: {line}\n{query['sql']}")
+                if not sorts:
+                    self.assertIsNone(FULL_SORT.search(line), f"{label}: {line}\n{query['sql']}")
+
+    def test_full_scans_are_detected(self):
+        sql, params = Book.objects.filter(title__icontains="engine").query.sql_with_params()
+        self.assertTrue(any(FULL_SCAN.search(line) for line in query_plan(sql, params)))
+        sql, params = Book.objects.filter(author=self.author).order_by("title").query.sql_with_params()
+        self.assertTrue(any(FULL_SORT.search(line) for line in query_plan(sql, params)))
+
+    def test_no_full_table_scans(self):
+        values = {
+            "title": "engine",
+            "publication_year": 1843,
+            "author": self.author.pk,
+            "author_name": "lovelace",
+        }
+        for size in range(len(self.FILTERS) + 1):
+            for names in combinations(self.FILTERS, size):
+                for ordering in self.ORDERINGS:
+                    params = {name: values[name] for name in names}
+                    label = f"{params} ordering={ordering}"
+                    with self.subTest(label), CaptureQueriesContext(connection) as context:
+                        response = self.client.get(reverse("book-list"), {**params, "ordering": ordering, "page_size": 2})
+                        self.assertEqual(len(response.data["results"]), 2)
+                        self.client.get(response.data["next"])
+                        self.assertNoFullScan(context.captured_queries, label, sorts=bool(SEARCH_FILTERS & set(names)))
+
+
+class BookSearchTests(APITestCase):
+    def setUp(self):
+        self.ada = Author.objects.create(name="Ada Lovelace")
+        self.bob = Author.objects.create(name="Charles Babbage")
+        self.notes = Book.objects.create(title="Notes on the Analytical Engine", publication_year=1843, author=self.ada)
+        self.passages = Book.objects.create(title="Passages from the Life", publication_year=1864, author=self.bob)
+
+    def search(self, **params):
+        response = self.client.get(reverse("book-list"), params)
+        return response.status_code, [book["id"] for book in response.data.get("results", [])]
+
+    def test_substrings_match_case_insensitively(self):
+        self.assertEqual(self.search(title="ANALYTICAL"), (200, [self.notes.pk]))
+        self.assertEqual(self.search(title="the"), (200, [self.notes.pk, self.passages.pk]))
+        self.assertEqual(self.search(author_name="babb"), (200, [self.passages.pk]))
+        # Every trigram of the term is present, but not the term itself
+        self.assertEqual(self.search(title="the Life Notes"), (200, []))
+
+    def test_str(self):
+        self.assertEqual(str(self.notes), "Notes on the Analytical Engine (1843)")
+        str(BookTitleGram.objects.filter(item=self.notes).first())
+
+    def test_short_terms_still_match(self):
+        self.assertEqual(self.search(title="AN"), (200, [self.notes.pk]))
+        self.assertEqual(self.search(author_name="ba"), (200, [self.passages.pk]))
+        self.assertEqual(self.search(title="q"), (200, []))
+
+    def test_grams_follow_renames(self):
+        self.notes.title = "Sketch of the Engine"
+        self.notes.save(update_fields=["title"])
+        self.ada.name = "Augusta Ada King"
+        self.ada.save()
+        self.assertEqual(self.search(title="analytical"), (200, []))
+        self.assertEqual(self.search(title="sketch"), (200, [self.notes.pk]))
+        self.assertEqual(self.search(author_name="augusta"), (200, [self.notes.pk]))
+        self.assertFalse(AuthorNameGram.objects.filter(item=self.ada, gram="lov").exists())
+
+    def test_bulk_writes_keep_grams(self):
+        user = User.objects.create_user(username="owner", password="pass")
+        self.client.force_authenticate(user)
+        response = self.client.post(
+            reverse("book-bulk"), [{"title": "Bulk Loaded", "publication_year": 1900, "author": self.ada.pk}], format="json"
+        )
+        created = response.data[0]["id"]
+        self.assertEqual(self.search(title="loaded"), (200, [created]))
+        self.client.patch(reverse("book-bulk"), [{"id": created, "title": "Bulk Renamed"}], format="json")
+        self.assertEqual(self.search(title="loaded"), (200, []))
+        self.assertEqual(self.search(title="renamed"), (200, [created]))
+        self.client.delete(reverse("book-bulk"), {"ids": [created]}, format="json")
+        self.assertFalse(BookTitleGram.objects.filter(item_id=created).exists())
@@ -0,0 +1,44 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from .models import Author, Book
+from .serializers import BookSerializer, ValuesProjection, projection_for
+
+
+class BookProjectionTests(APITestCase):
+    def setUp(self):
+        author = Author.objects.create(name="Ada")
+        titles = ["Plain", 'Quotes " and \\ slashes', "Ünïcødé – 日本語", "Line\u2028separator", "Emoji 📚"]
+        for year, title in enumerate(titles, start=1990):
+            Book.objects.create(title=title, publication_year=year, author=author)
+        Book.objects.create(title="Draft", publication_year=2000, author=author, is_published=False)
+
+    def test_json_is_byte_identical_to_the_serializer(self):
+        queryset = Book.objects.order_by("id")
+        projection = projection_for(BookSerializer)
+        expected = JSONRenderer().render(BookSerializer(queryset, many=True).data)
+        self.assertEqual(JSONRenderer().render(projection.to_representation(projection.rows(queryset))), expected)
+
+    def test_list_view_uses_the_fast_path(self):
+        published = Book.objects.filter(is_published=True).order_by("id")
+        expected = JSONRenderer().render(
+            {"next": None, "previous": None, "results": BookSerializer(published, many=True).data}
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("book-list"), {"format": "json"})
+        self.assertEqual(response.content, expected)
+
+    def test_computed_fields_are_rejected(self):
+        class Computed(BookSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta(BookSerializer.Meta):
+                fields = BookSerializer.Meta.fields + ["label"]
+
+            def get_label(self, book):
+                return str(book)
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesProjection(Computed)
@@ -2,7 +2,7 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from .models import Book
+from .models import Author, Book
 
 
 class BookViewTests(APITestCase):
@@ -99,3 +99,173 @@ class BookViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertIn("detail", response.data)  # ✅ confirm error response
         self.assertEqual(Book.objects.count(), 1)
+
+
+class AuthorViewTests(APITestCase):
+    def setUp(self):
+        self.prolific = Author.objects.create(name="Prolific")
+        for year in range(1990, 2002):
+            Book.objects.create(title=f"Book {year}", publication_year=year, author=self.prolific)
+        Book.objects.create(title="Unpublished", publication_year=2020, author=self.prolific, is_published=False)
+
+    def add_authors(self, count):
+        for i in range(count):
+            author = Author.objects.create(name=f"Author {Author.objects.count()}")
+            Book.objects.create(title=f"Only book {i}", publication_year=2000, author=author)
+
+    def test_nested_books_are_capped_latest_first(self):
+        response = self.client.get(reverse("author-detail", args=[self.prolific.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["book_count"], 12)
+        self.assertEqual([book["publication_year"] for book in response.data["books"]], [2001, 2000, 1999, 1998, 1997])
+        self.assertTrue(response.data["books_url"].endswith(f"{reverse('book-list')}?author={self.prolific.pk}"))
+
+    def test_list_query_count_is_constant(self):
+        self.add_authors(2)
+        with self.assertNumQueries(3):  # count, authors, books
+            self.client.get(reverse("author-list"))
+        self.add_authors(15)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("author-list"))
+        self.assertEqual(response.data["count"], 18)
+        self.assertEqual(len(response.data["results"]), 18)
+
+
+class BookPaginationTests(APITestCase):
+    def setUp(self):
+        self.ada = Author.objects.create(name="Ada")
+        self.bob = Author.objects.create(name="Bob")
+        # Several books per year, so the year ordering has ties to break on id
+        for i in range(12):
+            Book.objects.create(title=f"Book {i}", publication_year=1990 + i % 4, author=(self.ada, self.bob)[i % 2])
+        Book.objects.create(title="Draft", publication_year=1990, author=self.ada, is_published=False)
+
+    def walk(self, params, backwards=False):
+        """Follow next (or, from the last page, previous) links; returns (ids, pages)."""
+        response = self.client.get(reverse("book-list"), params)
+        pages = [response.data]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append(response.data)
+        if backwards:
+            pages = [response.data]
+            while response.data["previous"]:
+                response = self.client.get(response.data["previous"])
+                pages.insert(0, response.data)
+        return [book["id"] for page in pages for book in page["results"]], pages
+
+    def expected(self, *ordering, **filters):
+        return list(Book.objects.filter(is_published=True, **filters).order_by(*ordering).values_list("id", flat=True))
+
+    def test_pages_are_bounded_by_page_size(self):
+        ids, pages = self.walk({"page_size": 5})
+        self.assertEqual([len(page["results"]) for page in pages], [5, 5, 2])
+        self.assertEqual(ids, self.expected("id"))
+        self.assertIsNone(pages[0]["previous"])
+        with self.assertNumQueries(1):  # no COUNT, just the page
+            self.client.get(pages[1]["next"])
+
+    def test_year_ordering_breaks_ties_on_id(self):
+        ids, _ = self.walk({"page_size": 5, "ordering": "-publication_year"})
+        self.assertEqual(ids, self.expected("-publication_year", "-id"))
+        ids, _ = self.walk({"page_size": 5, "ordering": "publication_year"}, backwards=True)
+        self.assertEqual(ids, self.expected("publication_year", "id"))
+
+    def test_filters_and_search_apply_to_every_page(self):
+        ids, _ = self.walk({"page_size": 2, "author": self.bob.pk, "ordering": "publication_year"})
+        self.assertEqual(ids, self.expected("publication_year", "id", author=self.bob))
+        ids, _ = self.walk({"page_size": 2, "search": "Ada"})
+        self.assertEqual(ids, self.expected("id", author=self.ada))
+
+    def test_orderings_without_an_index_are_ignored(self):
+        ids, _ = self.walk({"ordering": "title"})
+        self.assertEqual(ids, self.expected("id"))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("book-list"), {"cursor": "cD1ub3Bl"})  # p=nope
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookBulkViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="pass")
+        self.other_user = User.objects.create_user(username="other", password="pass")
+        self.author = Author.objects.create(name="Ada")
+        self.mine = [
+            Book.objects.create(title=f"Mine {i}", publication_year=2000 + i, author=self.author, owner=self.user)
+            for i in range(3)
+        ]
+        self.theirs = Book.objects.create(title="Theirs", publication_year=2001, author=self.author, owner=self.other_user)
+        self.url = reverse("book-bulk")
+        self.client.force_authenticate(self.user)
+
+    def test_create_sets_owner_and_writes_once(self):
+        data = [{"title": f"New {i}", "publication_year": 1990 + i, "author": self.author.pk} for i in range(20)]
+        with self.assertNumQueries(5):  # savepoint, authors, insert, title grams, release
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([book["title"] for book in response.data], [item["title"] for item in data])
+        self.assertTrue(all(book["id"] for book in response.data))
+        self.assertEqual(Book.objects.filter(owner=self.user, title__startswith="New").count(), 20)
+
+    def test_create_is_all_or_nothing(self):
+        data = [
+            {"title": "Fine", "publication_year": 1990, "author": self.author.pk},
+            {"title": "Future", "publication_year": 9999, "author": self.author.pk},
+            {"title": "Orphan", "publication_year": 1990, "author": 999},
+        ]
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {1})
+        self.assertIn("publication_year", response.data[1])
+        self.assertFalse(Book.objects.filter(title="Fine").exists())
+
+        response = self.client.post(self.url, [data[0], data[2]], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {1})
+        self.assertIn("author", response.data[1])
+        self.assertFalse(Book.objects.filter(title="Fine").exists())
+
+    def test_update(self):
+        data = [{"id": book.pk, "title": f"Renamed {book.pk}"} for book in self.mine]
+        data[0]["publication_year"] = 1980
+        with self.assertNumQueries(6):  # savepoint, books, update, old and new title grams, release
+            response = self.client.patch(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for book in self.mine:
+            book.refresh_from_db()
+            self.assertEqual(book.title, f"Renamed {book.pk}")
+        self.assertEqual(self.mine[0].publication_year, 1980)
+        self.assertEqual(self.mine[1].publication_year, 2001)
+
+    def test_update_requires_ownership_of_every_book(self):
+        data = [{"id": self.mine[0].pk, "title": "Renamed"}, {"id": self.theirs.pk, "title": "Stolen"}]
+        response = self.client.patch(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Book.objects.filter(title__in=["Renamed", "Stolen"]).exists())
+
+        response = self.client.patch(self.url, [{"id": 999, "title": "Ghost"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.patch(self.url, [{"title": "No id"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete(self):
+        ids = [book.pk for book in self.mine[:2]]
+        with self.assertNumQueries(6):  # savepoint, ownership, collect, grams, books, release
+            response = self.client.delete(self.url, {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Book.objects.filter(owner=self.user)), [self.mine[2]])
+
+    def test_delete_requires_ownership_of_every_book(self):
+        ids = [self.mine[0].pk, self.theirs.pk]
+        response = self.client.delete(self.url, {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Book.objects.count(), 4)
+        response = self.client.delete(self.url, {"ids": [self.mine[0].pk] * 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_anonymous_users_cannot_write(self):
+        self.client.force_authenticate(None)
+        response = self.client.delete(self.url, {"ids": [self.mine[0].pk]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Book.objects.count(), 4)
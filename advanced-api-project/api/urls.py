@@ -6,6 +6,9 @@ from .views import (
     BookCreateView,
     BookUpdateView,
     BookDeleteView,
+    BookBulkView,
+    AuthorListView,
+    AuthorDetailView,
 )
 
 urlpatterns = [
@@ -14,4 +17,7 @@ urlpatterns = [
     path("books/create/", BookCreateView.as_view(), name="book-create"),
     path("books/update/", BookUpdateView.as_view(), name="book-update"),
     path("books/delete/", BookDeleteView.as_view(), name="book-delete"),
+    path("books/bulk/", BookBulkView.as_view(), name="book-bulk"),
+    path("authors/", AuthorListView.as_view(), name="author-list"),
+    path("authors/<int:pk>/", AuthorDetailView.as_view(), name="author-detail"),
 ]
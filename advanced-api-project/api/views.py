@@ -1,9 +1,20 @@
 # api/views.py
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
-from django_filters import rest_framework as filters  # ✅ for filtering
-from .models import Book
-from .serializers import BookSerializer
+from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from .filters import BookFilter
+from .models import Author, Book
+from .pagination import AuthorPagination, BookCursorPagination
+from .serializers import (
+    AuthorSerializer,
+    BookBulkSerializer,
+    BookIdsSerializer,
+    BookSerializer,
+    projection_for,
+)
 from .permissions import IsOwnerOrReadOnly
 
 
@@ -11,8 +22,13 @@ from .permissions import IsOwnerOrReadOnly
 class BookListView(generics.ListAPIView):
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.DjangoFilterBackend]  # ✅ enable filtering
-    filterset_fields = ["title", "publication_year", "author"]  # fields allowed for filtering
+    pagination_class = BookCursorPagination  # pages are bounded by page_size
+    # filter_backends: the REST_FRAMEWORK defaults (filtering, search, ordering)
+    filterset_class = BookFilter  # api/test_filters.py checks the indexes behind it
+    search_fields = ["title", "author__name"]
+    # Only orderings BookCursorPagination has an index for
+    ordering_fields = ["publication_year", "id"]
+    ordering = ["id"]
 
     def get_queryset(self):
         """
@@ -20,6 +36,18 @@ class BookListView(generics.ListAPIView):
         """
         return Book.objects.filter(is_published=True)
 
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the list through the values() fast path of BookSerializer:
+        same JSON, without a model instance per row.
+        """
+        projection = projection_for(self.get_serializer_class())
+        rows = projection.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.to_representation(page))
+        return Response(projection.to_representation(rows))
+
 
 # DETAIL VIEW (anyone can read)
 class BookDetailView(generics.RetrieveAPIView):
@@ -59,3 +87,106 @@ class BookDeleteView(generics.DestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthenticated, IsOwnerOrReadOnly]
+
+
+# BULK VIEW (authenticated users create; only owners update or delete)
+class BookBulkView(generics.GenericAPIView):
+    """
+    Writes many books per request:
+
+    * POST a list of books to create them, owned by the requester;
+    * PATCH a list of partial books, each with its "id", to update them;
+    * DELETE {"ids": [...]} to delete them.
+
+    A request is validated as a whole and written in one transaction, with
+    one bulk query per write. Ownership is checked as IsOwnerOrReadOnly
+    would, but with one query for the whole set: if any book is not the
+    requester's, nothing is written.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookBulkSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, many=True, **kwargs)
+
+    def get_ids(self, ids):
+        serializer = BookIdsSerializer(data={"ids": ids})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["ids"]
+
+    def check_owner(self, ids, owners):
+        """
+        Set-based IsOwnerOrReadOnly: ``owners`` maps the pk of each book
+        found to its owner_id.
+        """
+        missing = [pk for pk in ids if pk not in owners]
+        if missing:
+            raise NotFound(f"No books with ids {missing}.")
+        not_owned = [pk for pk in ids if owners[pk] != self.request.user.pk]
+        if not_owned:
+            raise PermissionDenied(f"You do not own the books with ids {not_owned}.")
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(owner=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items = request.data if isinstance(request.data, list) else []
+        ids = self.get_ids([item.get("id") if isinstance(item, dict) else None for item in items])
+        with transaction.atomic():
+            books = self.get_queryset().select_for_update().in_bulk(ids)
+            self.check_owner(ids, {pk: book.owner_id for pk, book in books.items()})
+            serializer = self.get_serializer([books[pk] for pk in ids], data=items, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return Response(serializer.data)
+
+    def delete(self, request, *args, **kwargs):
+        ids = self.get_ids(request.data.get("ids") if isinstance(request.data, dict) else None)
+        with transaction.atomic():
+            books = self.get_queryset().filter(pk__in=ids)
+            self.check_owner(ids, dict(books.select_for_update().values_list("pk", "owner_id")))
+            books.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# AUTHOR VIEWS (anyone can read)
+AUTHOR_BOOKS_LIMIT = 5  # nested books per author; the rest are behind books_url
+
+
+def author_queryset(books_limit=AUTHOR_BOOKS_LIMIT):
+    """
+    Authors with their published-book count and latest ``books_limit``
+    published books, fetched in one query for any number of authors.
+    """
+    latest_books = (
+        Book.objects.filter(is_published=True)
+        .order_by("-publication_year", "-id")[:books_limit]  # sliced per author
+    )
+    return Author.objects.annotate(
+        book_count=Count("books", filter=Q(books__is_published=True)),
+    ).prefetch_related(Prefetch("books", queryset=latest_books, to_attr="top_books"))
+
+
+class AuthorListView(generics.ListAPIView):
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = AuthorPagination
+    search_fields = ["name"]
+    ordering_fields = ["name", "book_count", "id"]
+    ordering = ["name", "id"]
+
+    def get_queryset(self):
+        return author_queryset()
+
+
+class AuthorDetailView(generics.RetrieveAPIView):
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        return author_queryset()
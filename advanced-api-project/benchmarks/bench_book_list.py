@@ -0,0 +1,80 @@
+"""
+Rows/second of the Book list serialization, before and after the fast path.
+
+"before" is ``BookSerializer(queryset, many=True)`` (a model instance and a
+field walk per row); "after" is ``ValuesProjection`` over ``values_list()``.
+Both include the query and ``JSONRenderer``, and their output is checked to
+be byte-identical. Runs against a scratch test database, e.g.::
+
+    python benchmarks/bench_book_list.py --books 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "advanced_api_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.models import Author, Book  # noqa: E402
+from api.serializers import BookSerializer, projection_for  # noqa: E402
+
+
+def seed(count):
+    Book.objects.all().delete()
+    authors = Author.objects.bulk_create([Author(name=f"Author {i}") for i in range(100)])
+    for offset in range(0, count, 10_000):
+        Book.objects.bulk_create([
+            Book(title=f"Book number {i}", publication_year=1900 + i % 120, author=authors[i % 100])
+            for i in range(offset, min(offset + 10_000, count))
+        ])
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    renderer = JSONRenderer()
+    projection = projection_for(BookSerializer)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        print(f'{"books":>8} {"before rows/s":>15} {"after rows/s":>15} {"speedup":>8}')
+        for count in args.books:
+            seed(count)
+            queryset = Book.objects.filter(is_published=True)
+            before, expected = best_of(
+                lambda: renderer.render(BookSerializer(queryset.all(), many=True).data), args.repeat
+            )
+            after, actual = best_of(
+                lambda: renderer.render(projection.to_representation(projection.rows(queryset.all()))), args.repeat
+            )
+            assert actual == expected, "fast path output differs"
+            print(f"{count:>8} {count / before:>15,.0f} {count / after:>15,.0f} {before / after:>7.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load-test the sync and async read views through the ASGI handler.
+
+Requests are fed straight into ``django.core.asgi.get_asgi_application()``
+from one event loop, ``--concurrency`` at a time, once with the sync views
+and once with ``BLOG_ASYNC_VIEWS`` on. Each client can also be slowed down
+(``--client-delay``) to model readers on poor connections.
+
+Under ASGI a sync view runs in a thread through ``sync_to_async``, and the
+async ORM delegates each query to that same thread, so database time is
+serialised either way; the difference shows up in how much of a request's
+life holds that thread.
+"""
+import argparse
+import asyncio
+import importlib
+import statistics
+import time
+
+from _setup import benchmark_database, seed_posts
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.urls import clear_url_caches
+
+from blog.models import Post
+from blog.view_counter import view_counter
+
+
+def use_async_views(enabled):
+    settings.BLOG_ASYNC_VIEWS = enabled
+    import blog.urls
+    import django_blog.urls
+    importlib.reload(blog.urls)
+    importlib.reload(django_blog.urls)
+    clear_url_caches()
+
+
+async def fetch(app, path, client_delay):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    disconnected = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if not sent:
+            sent.append(True)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    status = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif client_delay:
+            await asyncio.sleep(client_delay)  # a client draining the body slowly
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    disconnected.set()
+    if status != [200]:
+        raise RuntimeError(f'{path}?{query} answered {status}')
+    return (time.perf_counter() - start) * 1000
+
+
+async def load(app, paths, requests, concurrency, client_delay):
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(paths[i % len(paths)])
+    timings = []
+
+    async def worker():
+        while not queue.empty():
+            timings.append(await fetch(app, queue.get_nowait(), client_delay))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=5_000)
+    parser.add_argument('--requests', type=int, default=1_000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--client-delay', type=float, default=0.0,
+                        help='Seconds each client takes to receive the body.')
+    args = parser.parse_args()
+
+    # View counts are flushed by a background thread, as in django_blog/asgi.py,
+    # and that writer needs a database on disk (see benchmark_database).
+    with benchmark_database(on_disk=True):
+        seed_posts(args.posts)
+        for post in Post.objects.order_by('-pk')[:50]:
+            post.tags.add('bench')
+        newest = Post.objects.order_by('-pk').values_list('pk', flat=True)[:20]
+        paths = ['/', '/?page=3', '/tags/bench/'] + [f'/post/{pk}/' for pk in newest]
+
+        app = get_asgi_application()
+        view_counter.start_flusher()
+        print(f'{args.posts} posts, {args.requests} requests per run, client delay {args.client_delay}s')
+        print(f'{"views":>6} {"clients":>8} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9}')
+        for enabled in (False, True):
+            use_async_views(enabled)
+            asyncio.run(load(app, paths, len(paths), 1, 0))  # warm-up
+            for concurrency in args.concurrency:
+                elapsed, timings = asyncio.run(
+                    load(app, paths, args.requests, concurrency, args.client_delay)
+                )
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(f'{"async" if enabled else "sync":>6} {concurrency:>8} '
+                      f'{args.requests / elapsed:>9.0f} {statistics.median(timings):>9.1f} {p95:>9.1f}')
+        view_counter.flush()  # nothing left for the exit-time flush once the database is gone
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Compare the post list before and after precomputed excerpts, on long posts.
+
+"before" selects every column and truncates ``content`` in the template, as
+``post_list.html`` used to; "after" defers ``content`` and prints the stored
+``excerpt``. For one page of posts it reports the bytes the list query
+returns and the time to run the query and render the cards.
+"""
+import argparse
+
+from _setup import benchmark_database, best_of, seed_posts
+
+from django.db import connection
+from django.template import engines
+
+from blog.models import Post, make_excerpt
+
+PER_PAGE = 5
+
+BEFORE = '{% for post in posts %}<div>{{ post.content|truncatechars:200|safe }}</div>{% endfor %}'
+AFTER = '{% for post in posts %}<div>{{ post.excerpt|safe }}</div>{% endfor %}'
+
+
+def row_bytes(queryset):
+    """Total size of the values the database returns for ``queryset``."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(len(value) if isinstance(value, (str, bytes)) else 8
+                   for row in cursor.fetchall() for value in row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--content-kb', type=int, default=20, help='Size of each post body.')
+    args = parser.parse_args()
+
+    content = ('Long-form paragraph text for the benchmark. ' * 24 + '\n\n') * (args.content_kb * 1024 // 1100 + 1)
+    with benchmark_database():
+        seed_posts(args.posts, batch_size=500, content=content)
+        Post.objects.update(excerpt=make_excerpt(content))  # bulk_create skips Post.save()
+
+        base = Post.objects.select_related('author')[:PER_PAGE]
+        cases = {
+            'before': (base, engines['django'].from_string(BEFORE)),
+            'after': (base.defer('content'), engines['django'].from_string(AFTER)),
+        }
+        print(f'{args.posts} posts of ~{len(content) // 1024} KB, {PER_PAGE} per page')
+        print(f'{"":>8} {"bytes read":>12} {"query+render ms":>16}')
+        for name, (queryset, template) in cases.items():
+            def page():
+                template.render({'posts': list(queryset.all())})
+
+            print(f'{name:>8} {row_bytes(queryset):>12,} {best_of(page, repeat=20):>16.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare offset and keyset pagination of the post list at increasing depth.
+
+Offset pages pay for a COUNT(*) plus walking OFFSET rows, so their latency
+grows with the page number; keyset pages seek straight to the cursor.
+"""
+import argparse
+
+from _setup import benchmark_database, best_of, seed_posts
+
+from django.core.paginator import Paginator
+
+from blog.models import Post
+from blog.pagination import KeysetPaginator
+
+PER_PAGE = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        seed_posts(args.posts)
+        queryset = Post.objects.all()
+        ordering = Post._meta.ordering
+        keyset = KeysetPaginator(queryset, PER_PAGE, ordering)
+        last_page = (args.posts + PER_PAGE - 1) // PER_PAGE
+
+        print(f'{args.posts} posts, {PER_PAGE} per page')
+        print(f'{"page":>10} {"offset ms":>12} {"keyset ms":>12}')
+        depth = 1
+        while depth <= last_page:
+            def offset_page():
+                list(Paginator(queryset, PER_PAGE).page(depth).object_list)
+
+            # The cursor a reader would hold after reaching this depth.
+            anchor = queryset[(depth - 1) * PER_PAGE - 1] if depth > 1 else None
+            cursor = keyset.cursor_for(anchor) if anchor is not None else None
+
+            def keyset_page():
+                list(keyset.page(cursor))
+
+            print(f'{depth:>10} {best_of(offset_page):>12.2f} {best_of(keyset_page):>12.2f}')
+            depth *= 10
+
+
+if __name__ == '__main__':
+    main()
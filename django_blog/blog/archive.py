@@ -0,0 +1,90 @@
+"""
+Per-month post counts for the archive pages, kept in ``ArchiveBucket``.
+
+Each row counts one author's posts in one calendar month (in the site's time
+zone), so the archive sidebar sums a handful of small rows instead of
+grouping the whole post table by month on every view. The receivers in
+``blog.signals`` adjust the counts with single UPDATE statements as posts are
+created, moved between authors or months, and deleted; ``import_blog`` adds
+its batches through ``add_posts``. ``rebuild`` (the ``rebuild_archive_counts``
+command) recounts everything from the posts.
+
+The sidebar's month list is cached against ``content_version`` like the
+other derived listings, so a warm cache serves it without any query.
+"""
+from collections import Counter
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import content_version
+from .models import ArchiveBucket, Post
+
+CACHE_PREFIX = 'blog:archive-months'
+
+
+def bucket_for(created_at):
+    """``(year, month)`` of a post's creation time, in the current time zone."""
+    local = timezone.localtime(created_at)
+    return local.year, local.month
+
+
+def month_range(year, month):
+    """Aware ``[start, end)`` datetimes of a month, for index range scans."""
+    tz = timezone.get_current_timezone()
+    start = datetime(year, month, 1, tzinfo=tz)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+    return start, end
+
+
+def add(author_id, year, month, delta):
+    """Adjust one bucket by ``delta``, creating it on the author's first post of the month."""
+    buckets = ArchiveBucket.objects.filter(author_id=author_id, year=year, month=month)
+    if buckets.update(post_count=F('post_count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            ArchiveBucket.objects.create(author_id=author_id, year=year, month=month, post_count=delta)
+    except IntegrityError:
+        # A concurrent save created the bucket between the two statements.
+        buckets.update(post_count=F('post_count') + delta)
+
+
+def add_posts(posts):
+    """Count newly created ``posts`` (e.g. an import batch) with one update per bucket."""
+    counts = Counter((post.author_id, *bucket_for(post.created_at)) for post in posts)
+    for (author_id, year, month), count in counts.items():
+        add(author_id, year, month, count)
+
+
+@transaction.atomic
+def rebuild():
+    """Recount every bucket from the posts. Returns the number of buckets written."""
+    counts = Counter()
+    for author_id, created_at in Post.objects.values_list('author_id', 'created_at').iterator(chunk_size=10_000):
+        counts[author_id, *bucket_for(created_at)] += 1
+    ArchiveBucket.objects.all().delete()
+    ArchiveBucket.objects.bulk_create([
+        ArchiveBucket(author_id=author_id, year=year, month=month, post_count=count)
+        for (author_id, year, month), count in counts.items()
+    ], batch_size=1000)
+    return len(counts)
+
+
+def month_counts(author_id=None):
+    """``[(date(year, month, 1), count), ...]`` newest month first, site-wide or for one author."""
+    key = f'{CACHE_PREFIX}:{content_version.current()}:{author_id or "all"}'
+    months = cache.get(key)
+    if months is None:
+        buckets = ArchiveBucket.objects.filter(post_count__gt=0)
+        if author_id is not None:
+            buckets = buckets.filter(author_id=author_id)
+        months = [
+            (date(row['year'], row['month'], 1), row['total'])
+            for row in buckets.values('year', 'month').annotate(total=Sum('post_count')).order_by('-year', '-month')
+        ]
+        cache.set(key, months)
+    return months
@@ -0,0 +1,136 @@
+"""
+Async versions of the blog's read views, for ASGI deployments.
+
+A sync view under ASGI occupies a worker thread for its whole run, slow
+clients included. These views instead await the async ORM (``aget``,
+``acount``, ``aiterator``) so one process can hold many connections open.
+They render the same templates with the same context as their sync
+counterparts in ``blog.views`` and share their queryset building.
+
+Everything a template or a ``condition`` validator could read lazily from
+the database (``request.user``, the detail validators' row, related objects)
+is loaded up front, because sync ORM access raises in an async context.
+The versioned result cache used by the sync list is blocking, so search and
+tag listings here query the index directly.
+
+``blog.urls`` routes to these views when ``BLOG_ASYNC_VIEWS`` is true.
+"""
+from django.conf import settings
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
+from taggit.models import Tag
+
+from . import conditional
+from .forms import CommentForm
+from .models import Comment, Post
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import asearch_stats
+from .views import PostDetailView, PostListView, filter_posts, related_posts_query
+from .view_counter import view_counter
+
+
+class AsyncReadView(View):
+    async def dispatch(self, request, *args, **kwargs):
+        # Resolve the lazy user now; templates and validators read it synchronously.
+        request.user = await request.auser()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncPostListView(AsyncReadView):
+    template_name = PostListView.template_name
+    paginate_by = PostListView.paginate_by
+    ordering = PostListView.ordering
+    page_kwarg = 'page'
+    cursor_kwarg = PostListView.cursor_kwarg
+
+    def get_pagination_mode(self):
+        return getattr(settings, 'BLOG_PAGINATION', 'page')
+
+    async def get_queryset(self):
+        tag = None
+        if tag_slug := self.kwargs.get('tag_slug'):
+            try:
+                tag = await Tag.objects.aget(slug=tag_slug)
+            except Tag.DoesNotExist:
+                raise Http404('No Tag matches the given query.')
+        queryset = Post.objects.order_by(*self.ordering)
+        query = self.request.GET.get('q')
+        if not query:
+            return filter_posts(queryset, None, tag)
+        return filter_posts(queryset, query, tag, stats=await asearch_stats(query))
+
+    async def paginate(self, queryset):
+        if self.get_pagination_mode() == 'cursor':
+            ordering = queryset.query.order_by or Post._meta.ordering
+            paginator = KeysetPaginator(queryset, self.paginate_by, ordering)
+            try:
+                page = await paginator.apage(self.request.GET.get(self.cursor_kwarg))
+            except InvalidCursor as e:
+                raise Http404(str(e))
+            return paginator, page
+
+        paginator = Paginator(queryset, self.paginate_by)
+        paginator.count = await queryset.acount()  # Paginator.count would query synchronously
+        number = self.request.GET.get(self.page_kwarg) or 1
+        try:
+            number = paginator.num_pages if number == 'last' else paginator.validate_number(number)
+        except InvalidPage as e:
+            raise Http404(f'Invalid page ({number}): {e}')
+        bottom = (number - 1) * self.paginate_by
+        rows = queryset[bottom:bottom + self.paginate_by].aiterator(chunk_size=self.paginate_by)
+        return paginator, Page([row async for row in rows], number, paginator)
+
+    @method_decorator(condition(etag_func=conditional.post_list_etag,
+                                last_modified_func=conditional.post_list_last_modified))
+    async def get(self, request, **kwargs):
+        paginator, page = await self.paginate(await self.get_queryset())
+        return render(request, self.template_name, {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            'posts': page.object_list,
+            'search_query': request.GET.get('q', ''),
+            'current_tag': self.kwargs.get('tag_slug'),
+            'cursor_pagination': self.get_pagination_mode() == 'cursor',
+        })
+
+
+class AsyncPostByTagListView(AsyncPostListView):
+    """Async counterpart of PostByTagListView."""
+    pass
+
+
+class AsyncPostDetailView(AsyncReadView):
+    template_name = PostDetailView.template_name
+    comments_paginate_by = PostDetailView.comments_paginate_by
+
+    async def dispatch(self, request, *args, **kwargs):
+        await conditional.aload_post_state(request, kwargs['pk'])
+        return await super().dispatch(request, *args, **kwargs)
+
+    @method_decorator(condition(etag_func=conditional.post_detail_etag,
+                                last_modified_func=conditional.post_detail_last_modified))
+    async def get(self, request, pk):
+        try:
+            post = await Post.objects.select_related('author').prefetch_related('tags').aget(pk=pk)
+        except Post.DoesNotExist:
+            raise Http404('No Post matches the given query.')
+        await view_counter.arecord(pk)
+        comments = await KeysetPaginator(
+            Comment.objects.filter(post_id=pk).select_related('author'),
+            self.comments_paginate_by,
+            Comment._meta.ordering,
+        ).apage()
+        return render(request, self.template_name, {
+            'object': post,
+            'post': post,
+            'comment_form': CommentForm(),
+            'comments': comments,
+            'comment_count': post.comment_count,
+            'related_posts': [link.related async for link in related_posts_query(pk)],
+        })
@@ -0,0 +1,99 @@
+"""
+Validators for conditional GET on the blog's read views.
+
+They are plugged into ``django.views.decorators.http.condition`` so that a
+request carrying a matching ``If-None-Match`` / ``If-Modified-Since`` gets a
+304 before the view runs its queries or renders a template.
+
+* Post detail: one single-row lookup of ``updated_at``, ``comment_count`` and
+  ``comments_changed_at``; the comment thread itself is never loaded. The
+  related-posts list depends on other posts, so the global
+  ``blog.content_version`` (bumped by every post, tag and comment write and
+  by ``related.rebuild()``) is part of the validators too.
+* Post lists: the global ``blog.content_version`` token plus the full URL.
+
+Pages differ per user (edit links, the comment form), so the ETag includes
+the viewer and ``Last-Modified`` is only offered to anonymous visitors.
+While a flash message is waiting to be shown (say, after a refused edit
+redirected back to the post) no validator is offered at all, since a 304
+would never display it.
+"""
+import hashlib
+
+from django.contrib import messages
+
+from . import content_version
+from .models import Post
+
+
+def _viewer(request):
+    return str(request.user.pk) if request.user.is_authenticated else 'anon'
+
+
+def _has_messages(request):
+    # len() loads the pending messages without marking them as shown.
+    return len(messages.get_messages(request)) > 0
+
+
+def _etag(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _post_state_query(pk):
+    return Post.objects.filter(pk=pk).order_by().values(
+        'updated_at', 'comment_count', 'comments_changed_at'
+    )[:1]
+
+
+def _post_state(request, pk):
+    # etag_func and last_modified_func both need the row; fetch it once.
+    cache = request.__dict__.setdefault('_blog_post_state', {})
+    if pk not in cache:
+        rows = _post_state_query(pk)
+        cache[pk] = rows[0] if rows else None
+    return cache[pk]
+
+
+async def aload_post_state(request, pk):
+    """
+    Fetch the detail validators' row ahead of time for async views.
+
+    ``condition`` calls the validators synchronously, where the ORM is not
+    allowed under ASGI; with the row memoized they never reach the database.
+    """
+    cache = request.__dict__.setdefault('_blog_post_state', {})
+    if pk not in cache:
+        rows = [row async for row in _post_state_query(pk)]
+        cache[pk] = rows[0] if rows else None
+
+
+def post_detail_etag(request, pk, **kwargs):
+    state = _post_state(request, pk)
+    if state is None or _has_messages(request):
+        return None  # no state: let the view produce its 404
+    return _etag(
+        'post', pk, state['updated_at'].isoformat(), state['comment_count'],
+        state['comments_changed_at'], content_version.current(), _viewer(request),
+    )
+
+
+def post_detail_last_modified(request, pk, **kwargs):
+    state = _post_state(request, pk)
+    if state is None or request.user.is_authenticated or _has_messages(request):
+        return None
+    return max(filter(None, [
+        state['updated_at'], state['comments_changed_at'], content_version.changed_at(),
+    ]))
+
+
+def post_list_etag(request, **kwargs):
+    if _has_messages(request):
+        return None
+    return _etag('list', content_version.current(), request.get_full_path(), _viewer(request))
+
+
+def post_list_last_modified(request, **kwargs):
+    if request.user.is_authenticated or _has_messages(request):
+        return None
+    return content_version.changed_at()
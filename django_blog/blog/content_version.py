@@ -0,0 +1,46 @@
+"""
+A single token that changes whenever any blog content changes.
+
+Signal receivers in ``blog.signals`` call ``bump()`` on every post, tag and
+comment write, so anything derived from "the blog as a whole" (list page
+validators, cached query results) can be keyed on ``current()`` and is
+invalidated in O(1) without tracking what it depended on.
+
+The token lives in the default cache, which ``CACHES`` in the settings
+makes a shared backend (Redis, or a file cache on one machine): a bump made
+by another worker or a management command must reach every process. With a
+per-process cache such as LocMemCache, writes elsewhere would go unseen.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+
+CACHE_KEY = 'blog:content-version'
+
+
+def _new_state():
+    return uuid.uuid4().hex, timezone.now()
+
+
+def state():
+    """Return ``(token, changed_at)``, starting a new version if none is cached."""
+    value = cache.get(CACHE_KEY)
+    if value is None:
+        # A cold or evicted cache must not resurrect an old token, so start afresh.
+        value = _new_state()
+        if not cache.add(CACHE_KEY, value, timeout=None):
+            value = cache.get(CACHE_KEY, value)  # another request got there first
+    return value
+
+
+def current():
+    return state()[0]
+
+
+def changed_at():
+    return state()[1]
+
+
+def bump():
+    cache.set(CACHE_KEY, _new_state(), timeout=None)
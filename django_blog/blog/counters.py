@@ -0,0 +1,81 @@
+"""
+Denormalised comment counters on ``Post``.
+
+``comment_count`` and ``last_comment_at`` are adjusted with single UPDATE
+statements whenever a comment is created or deleted through the blog views,
+so readers get the numbers with the post row itself. ``comments_changed_at``
+additionally moves on edits, for the conditional GET validators in
+``blog.conditional``. ``rebuild`` and ``drifted_posts`` back the
+``rebuild_comment_counters`` command.
+"""
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Post
+
+
+def _actual_count():
+    return Coalesce(
+        Subquery(
+            Comment.objects.filter(post=OuterRef('pk')).order_by()
+            .values('post').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def _actual_last_comment_at():
+    return Subquery(
+        Comment.objects.filter(post=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    )
+
+
+def comment_added(comment):
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_comment_at=comment.created_at,
+        comments_changed_at=comment.created_at,
+    )
+
+
+def comment_edited(comment):
+    Post.objects.filter(pk=comment.post_id).update(comments_changed_at=comment.updated_at)
+
+
+def comment_removed(post_pk):
+    """Call after the comment row is gone; the newest remaining one is looked up."""
+    Post.objects.filter(pk=post_pk).update(
+        comment_count=F('comment_count') - 1,
+        last_comment_at=_actual_last_comment_at(),
+        comments_changed_at=timezone.now(),
+    )
+
+
+def drifted_posts():
+    """Posts whose stored counters disagree with their comments."""
+    return (
+        Post.objects.annotate(actual_count=_actual_count(), actual_last=_actual_last_comment_at())
+        .filter(
+            ~Q(comment_count=F('actual_count'))
+            | (Q(last_comment_at__isnull=False, actual_last__isnull=False)
+               & ~Q(last_comment_at=F('actual_last')))
+            | Q(last_comment_at__isnull=True, actual_last__isnull=False)
+            | Q(last_comment_at__isnull=False, actual_last__isnull=True)
+        )
+        .order_by('pk')
+    )
+
+
+def rebuild(queryset=None):
+    """Recompute the counters of ``queryset`` (all posts by default)."""
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.update(
+        comment_count=_actual_count(),
+        last_comment_at=_actual_last_comment_at(),
+        comments_changed_at=Subquery(
+            Comment.objects.filter(post=OuterRef('pk')).order_by()
+            .values('post').annotate(latest=Max('updated_at')).values('latest')
+        ),
+    )
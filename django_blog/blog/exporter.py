@@ -0,0 +1,155 @@
+"""
+Streaming export of posts and their comments (see ``ExportView`` and the
+``export_blog`` command).
+
+Posts are read with ``.values().iterator(chunk_size=...)`` in the list's
+``(-created_at, -id)`` order, with the author's username joined in. For each
+chunk the tags and comments of its posts are fetched with one query apiece,
+so memory is bounded by the chunk size whatever the table size, and output
+is produced line by line for ``StreamingHttpResponse`` or a file.
+
+Records use the same shape as ``blog.importer`` accepts, so an export can be
+imported elsewhere: NDJSON has one post per line with nested comments; CSV
+holds either posts (tags as a comma-separated cell) or comments.
+
+Filters map onto indexed columns: ``author`` on the unique username and the
+``author_id`` foreign key, ``tag`` on taggit's tag slug and through-table
+indexes, and ``since``/``until`` on ``created_at``.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from taggit.models import TaggedItem
+
+from .models import Comment, Post
+
+FORMATS = ('ndjson', 'csv')
+CSV_MODELS = ('posts', 'comments')
+POST_CSV_FIELDS = ['id', 'title', 'content', 'author', 'created_at', 'updated_at', 'tags']
+COMMENT_CSV_FIELDS = ['id', 'post_id', 'author', 'content', 'created_at', 'updated_at']
+
+
+class InvalidExportFilter(Exception):
+    pass
+
+
+def _parse_bound(name, value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise InvalidExportFilter(f'{name}: expected an ISO 8601 date or datetime, got {value!r}')
+        parsed = timezone.datetime(date.year, date.month, date.day)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filtered_posts(author=None, tag=None, since=None, until=None):
+    """Posts matching the export filters; ``since`` is inclusive, ``until`` exclusive."""
+    posts = Post.objects.all()
+    if author:
+        posts = posts.filter(author__username=author)
+    if tag:
+        # taggit keeps (tag, object) unique, so the join cannot duplicate posts.
+        posts = posts.filter(tags__slug=tag)
+    if since:
+        posts = posts.filter(created_at__gte=_parse_bound('since', since))
+    if until:
+        posts = posts.filter(created_at__lt=_parse_bound('until', until))
+    return posts
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def iter_posts(queryset, chunk_size=500, with_comments=True):
+    """Yield post dicts with ``tags`` and (optionally) ``comments`` filled in."""
+    rows = queryset.order_by('-created_at', '-id').values(
+        'id', 'title', 'content', 'author__username', 'created_at', 'updated_at',
+    ).iterator(chunk_size=chunk_size)
+    post_type = ContentType.objects.get_for_model(Post)
+    for chunk in _chunks(rows, chunk_size):
+        ids = [row['id'] for row in chunk]
+        tags = {pk: [] for pk in ids}
+        for object_id, name in (
+            TaggedItem.objects.filter(content_type=post_type, object_id__in=ids)
+            .order_by('tag__name').values_list('object_id', 'tag__name')
+        ):
+            tags[object_id].append(name)
+        comments = {pk: [] for pk in ids}
+        if with_comments:
+            for comment in (
+                Comment.objects.filter(post_id__in=ids).order_by('post_id', 'created_at', 'id')
+                .values('id', 'post_id', 'author__username', 'content', 'created_at', 'updated_at')
+            ):
+                comments[comment['post_id']].append({
+                    'id': comment['id'],
+                    'post_id': comment['post_id'],
+                    'author': comment['author__username'],
+                    'content': comment['content'],
+                    'created_at': _isoformat(comment['created_at']),
+                    'updated_at': _isoformat(comment['updated_at']),
+                })
+        for row in chunk:
+            post = {
+                'id': row['id'],
+                'title': row['title'],
+                'content': row['content'],
+                'author': row['author__username'],
+                'created_at': _isoformat(row['created_at']),
+                'updated_at': _isoformat(row['updated_at']),
+                'tags': tags[row['id']],
+            }
+            if with_comments:
+                post['comments'] = comments[row['id']]
+            yield post
+
+
+def ndjson_lines(queryset, chunk_size=500):
+    for post in iter_posts(queryset, chunk_size):
+        for comment in post['comments']:
+            del comment['post_id']  # implied by nesting
+        yield json.dumps(post, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the CSV line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset, model='posts', chunk_size=500):
+    writer = csv.writer(_Echo())
+    if model == 'posts':
+        yield writer.writerow(POST_CSV_FIELDS)
+        for post in iter_posts(queryset, chunk_size, with_comments=False):
+            post['tags'] = ', '.join(post['tags'])
+            yield writer.writerow([post[name] for name in POST_CSV_FIELDS])
+    else:
+        yield writer.writerow(COMMENT_CSV_FIELDS)
+        for post in iter_posts(queryset, chunk_size):
+            for comment in post['comments']:
+                yield writer.writerow([comment[name] for name in COMMENT_CSV_FIELDS])
+
+
+def export_lines(queryset, fmt='ndjson', model='posts', chunk_size=500):
+    if fmt not in FORMATS:
+        raise InvalidExportFilter(f'format: expected one of {", ".join(FORMATS)}, got {fmt!r}')
+    if fmt == 'csv':
+        if model not in CSV_MODELS:
+            raise InvalidExportFilter(f'model: expected one of {", ".join(CSV_MODELS)}, got {model!r}')
+        return csv_lines(queryset, model, chunk_size)
+    return ndjson_lines(queryset, chunk_size)
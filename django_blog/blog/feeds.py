@@ -0,0 +1,140 @@
+"""
+RSS and Atom feeds of the latest posts: site-wide, per tag and per author.
+
+Feeds are rendered with Django's syndication framework once and stored as
+bytes (plain and gzipped) in ``FeedDocument``, together with their ETag and
+Last-Modified. A poll is then one indexed row lookup, and usually a 304.
+The receivers in ``blog.signals`` delete the documents a post change affects
+(the site feed, its author's feed and its tags' feeds); the next poll of a
+deleted feed renders it again.
+"""
+import gzip
+import hashlib
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.contrib.syndication.views import Feed
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from taggit.models import Tag
+
+from .models import FeedDocument, Post
+
+FORMATS = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+FEED_LENGTH = 20
+
+
+@dataclass
+class FeedScope:
+    key: str              # FeedDocument.scope
+    label: str            # shown in the feed title
+    link: str             # the HTML page the feed mirrors
+    posts: object         # the Post queryset the feed covers
+
+
+def scope_key(kind, value=None):
+    # Keyed by what the feed URL carries, so a poll needs no other lookup.
+    return f'{kind}:{value}' if value is not None else kind
+
+
+def resolve_scope(kind, value=None):
+    """Return the FeedScope for a URL, raising DoesNotExist for unknown tags/authors."""
+    key = scope_key(kind, value)
+    if kind == 'tag':
+        tag = Tag.objects.get(slug=value)
+        return FeedScope(key, f'posts tagged "{tag.name}"',
+                         reverse('blog:post_list_by_tag', args=[tag.slug]), Post.objects.filter(tags=tag))
+    if kind == 'author':
+        author = User.objects.get(username=value)
+        return FeedScope(key, f'posts by {author.username}',
+                         reverse('blog:post_list'), Post.objects.filter(author=author))
+    return FeedScope(key, 'latest posts', reverse('blog:post_list'), Post.objects.all())
+
+
+class PostFeed(Feed):
+    feed_type = Rss201rev2Feed
+    description = 'Latest posts from Django Blog'
+
+    def title(self, scope):
+        return f'Django Blog: {scope.label}'
+
+    def link(self, scope):
+        return scope.link
+
+    def items(self, scope):
+        return scope.posts.order_by('-created_at', '-id').select_related('author').prefetch_related('tags')[:FEED_LENGTH]
+
+    def item_title(self, post):
+        return post.title
+
+    def item_description(self, post):
+        return Truncator(post.content).words(60)
+
+    def item_author_name(self, post):
+        return post.author.username
+
+    def item_pubdate(self, post):
+        return post.created_at
+
+    def item_updateddate(self, post):
+        return post.updated_at
+
+    def item_categories(self, post):
+        return [tag.name for tag in post.tags.all()]
+
+
+def render(scope, fmt, request):
+    feed = PostFeed()
+    feed.feed_type = FORMATS[fmt]
+    body = feed.get_feed(scope, request).writeString('utf-8').encode()
+    # Not just the newest post's updated_at: that goes back in time when the
+    # newest post is deleted, and If-Modified-Since would then answer 304.
+    latest = scope.posts.order_by().aggregate(latest=Max('updated_at'))['latest']
+    return FeedDocument(
+        scope=scope.key,
+        format=fmt,
+        host=request.get_host(),
+        body=body,
+        body_gzip=gzip.compress(body, mtime=0),
+        etag=hashlib.md5(body, usedforsecurity=False).hexdigest(),
+        last_modified=max(filter(None, [latest, timezone.now()])),
+    )
+
+
+def get_document(request, fmt, kind='site', value=None):
+    """
+    Return the stored feed, rendering and storing it on a miss.
+
+    Raises DoesNotExist (via ``resolve_scope``) for an unknown tag or author.
+    """
+    document = FeedDocument.objects.filter(
+        scope=scope_key(kind, value), format=fmt, host=request.get_host(),
+    ).first()
+    if document is None:
+        document = render(resolve_scope(kind, value), fmt, request)
+        try:
+            with transaction.atomic():
+                document.save()
+        except IntegrityError:
+            pass  # a concurrent poll stored the same feed first
+    return document
+
+
+def invalidate(scopes=None):
+    """Drop the stored feeds for ``scopes`` (all feeds when None)."""
+    documents = FeedDocument.objects.all()
+    if scopes is not None:
+        documents = documents.filter(scope__in=scopes)
+    documents.delete()
+
+
+def post_scopes(post, with_tags=False):
+    """Scopes of the feeds that list ``post``; its tags' feeds only if asked."""
+    scopes = ['site', scope_key('author', post.author.username)]
+    if with_tags:
+        scopes += [scope_key('tag', slug) for slug in post.tags.values_list('slug', flat=True)]
+    return scopes
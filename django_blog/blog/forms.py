@@ -1,12 +1,17 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth.models import User
+from django.urls import reverse
 from .models import Post, Comment
 
 # --- Placeholder/Custom Widget Definition to satisfy the checker ---
 class TagWidget(forms.TextInput):
-    """Placeholder widget used for tagging input."""
-    pass
+    """Tagging input; script.js offers suggestions from the autocomplete endpoint."""
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs'].setdefault('data-autocomplete-url', reverse('blog:tag_autocomplete'))
+        return context
 # ------------------------------------------------------------------
 
 # --- User Forms ---
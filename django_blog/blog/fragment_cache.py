@@ -0,0 +1,75 @@
+"""
+Cache for rendered per-post HTML fragments (the list card and the detail body).
+
+Each post/fragment pair owns one cache key. The stored entry remembers the
+version it was rendered from, ``updated_at`` plus a digest of the tag set, so
+an entry that missed an invalidation is still never served stale. Signal
+receivers in ``blog.signals`` delete the entries of a post whenever it is
+saved, deleted or re-tagged.
+
+Hit and miss counters live in the cache as well. The cache is shared by all
+processes (see ``CACHES`` in the settings), so the counters add up across
+workers and the ``fragment_cache_stats`` command reports them.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+FRAGMENTS = ('card', 'body')
+KEY_PREFIX = 'blog:fragment'
+HITS_KEY = f'{KEY_PREFIX}:stats:hits'
+MISSES_KEY = f'{KEY_PREFIX}:stats:misses'
+
+
+def fragment_key(post_pk, name):
+    return f'{KEY_PREFIX}:{name}:{post_pk}'
+
+
+def fragment_version(post):
+    """Identify the post state a fragment was rendered from."""
+    tags = ','.join(sorted(tag.name for tag in post.tags.all()))
+    digest = hashlib.md5(tags.encode(), usedforsecurity=False).hexdigest()
+    return f'{post.updated_at.timestamp()}:{digest}'
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_fragment(post, name):
+    """Return the cached HTML of ``name`` for ``post``, or None on a miss."""
+    entry = cache.get(fragment_key(post.pk, name))
+    if entry is not None and entry[0] == fragment_version(post):
+        _count(HITS_KEY)
+        return entry[1]
+    _count(MISSES_KEY)
+    return None
+
+
+def set_fragment(post, name, html):
+    timeout = getattr(settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+    cache.set(fragment_key(post.pk, name), (fragment_version(post), html), timeout)
+
+
+def invalidate_post(post_pk):
+    cache.delete_many([fragment_key(post_pk, name) for name in FRAGMENTS])
+
+
+def stats():
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
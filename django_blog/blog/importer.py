@@ -0,0 +1,263 @@
+"""
+Streaming bulk import of posts, comments and tags (see ``import_blog``).
+
+Input is read one record at a time and written in batches: each batch
+resolves its authors and tags with one query apiece, creates missing tags
+with ``bulk_create``, and inserts posts, tag links and comments with one
+``bulk_create`` per table inside a single transaction. Only the current batch
+is ever held in memory, so the input can be arbitrarily large.
+
+``bulk_create`` sends no model signals, so the work the receivers in
+``blog.signals`` would have done is repeated per batch: posts are added to
+the search index and the archive counts, the stored feeds that list them
+(site, author and tag) are dropped, and comment counters are recomputed for
+the touched posts.
+
+Accepted records (JSONL, one per line)::
+
+    {"title": ..., "content": ..., "author": "<username>",
+     "created_at": "<ISO 8601>", "tags": ["a", "b"],
+     "comments": [{"author": ..., "content": ..., "created_at": ...}]}
+    {"post_id": 42, "author": ..., "content": ..., "created_at": ...}
+
+The second form adds a comment to an existing post. CSV input holds one kind
+of record per file with the same column names; ``tags`` is a comma-separated
+cell.
+"""
+import csv
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from taggit.models import Tag, TaggedItem
+
+from . import archive, content_version, counters, feeds
+from .models import Comment, Post, make_excerpt
+from .search import index_new_posts
+
+
+class InvalidImportData(Exception):
+    pass
+
+
+@dataclass
+class ImportStats:
+    posts: int = 0
+    comments: int = 0
+    tags_created: int = 0
+    tag_links: int = 0
+    batches: int = 0
+
+    @property
+    def rows(self):
+        return self.posts + self.comments
+
+
+@dataclass
+class _Batch:
+    posts: list = field(default_factory=list)      # (line, record)
+    comments: list = field(default_factory=list)   # (line, record) with post_id
+
+    def __len__(self):
+        return len(self.posts) + len(self.comments)
+
+
+def read_jsonl(stream):
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise InvalidImportData(f'line {line_number}: {e}')
+
+
+def read_csv(stream):
+    for line_number, row in enumerate(csv.DictReader(stream), start=2):
+        record = {key: value for key, value in row.items() if value != ''}
+        if 'tags' in record:
+            record['tags'] = [tag.strip() for tag in record['tags'].split(',') if tag.strip()]
+        yield line_number, record
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """
+    Let imported rows keep their own created_at/updated_at.
+
+    auto_now/auto_now_add would overwrite them in ``bulk_create``; the flags
+    are switched off for the duration of the import only, which is safe in
+    the single-purpose management command process.
+    """
+    saved = []
+    for model in models:
+        for f in model._meta.concrete_fields:
+            if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False):
+                saved.append((f, f.auto_now, f.auto_now_add))
+                f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _timestamp(value, line_number, default):
+    if value in (None, ''):
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise InvalidImportData(f'line {line_number}: invalid datetime {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _require(record, keys, line_number):
+    missing = [key for key in keys if not record.get(key)]
+    if missing:
+        raise InvalidImportData(f'line {line_number}: missing {", ".join(missing)}')
+
+
+class BlogImporter:
+    def __init__(self, batch_size=1000, on_batch=None):
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.stats = ImportStats()
+        self.post_type = ContentType.objects.get_for_model(Post)
+
+    def run(self, records):
+        """Import ``(line_number, record)`` pairs and return the ImportStats."""
+        batch = _Batch()
+        with _explicit_timestamps(Post, Comment):
+            for line_number, record in records:
+                if 'post_id' in record:
+                    batch.comments.append((line_number, record))
+                else:
+                    batch.posts.append((line_number, record))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = _Batch()
+            if len(batch):
+                self._flush(batch)
+        if self.stats.rows:
+            content_version.bump()
+        return self.stats
+
+    def _users(self, usernames):
+        found = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+        missing = set(usernames) - found.keys()
+        if missing:
+            raise InvalidImportData(f'unknown author(s): {", ".join(sorted(missing))}')
+        return found
+
+    def _tags(self, names):
+        """Map tag names to ids, creating the missing tags in bulk."""
+        found = dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+        missing = [name for name in names if name not in found]
+        if missing:
+            slugs = {name: Tag().slugify(name) for name in missing}
+            taken = set(Tag.objects.filter(slug__in=slugs.values()).values_list('slug', flat=True))
+            new_tags = []
+            for name in missing:
+                slug, i = slugs[name], 1
+                while slug in taken:
+                    slug, i = Tag().slugify(name, i), i + 1
+                taken.add(slug)
+                new_tags.append(Tag(name=name, slug=slug))
+            Tag.objects.bulk_create(new_tags)
+            self.stats.tags_created += len(new_tags)
+            found.update(Tag.objects.filter(name__in=missing).values_list('name', 'pk'))
+        return found
+
+    @transaction.atomic
+    def _flush(self, batch):
+        now = timezone.now()
+        usernames = {record['author'] for _, record in batch.posts}
+        usernames.update(record['author'] for _, record in batch.comments if 'author' in record)
+        usernames.update(
+            comment['author'] for _, record in batch.posts
+            for comment in record.get('comments', ()) if 'author' in comment
+        )
+        users = self._users(usernames)
+
+        posts = []
+        for line_number, record in batch.posts:
+            _require(record, ('title', 'content', 'author'), line_number)
+            created_at = _timestamp(record.get('created_at'), line_number, now)
+            posts.append(Post(
+                title=record['title'],
+                content=record['content'],
+                excerpt=make_excerpt(record['content']),
+                author_id=users[record['author']],
+                created_at=created_at,
+                updated_at=_timestamp(record.get('updated_at'), line_number, created_at),
+            ))
+        Post.objects.bulk_create(posts)
+
+        tag_names = {name for _, record in batch.posts for name in record.get('tags', ())}
+        tag_ids = self._tags(tag_names) if tag_names else {}
+        links = [
+            TaggedItem(content_type=self.post_type, object_id=post.pk, tag_id=tag_ids[name])
+            for post, (_, record) in zip(posts, batch.posts)
+            for name in dict.fromkeys(record.get('tags', ()))
+        ]
+        TaggedItem.objects.bulk_create(links)
+
+        comments = []
+        for post, (line_number, record) in zip(posts, batch.posts):
+            for comment in record.get('comments', ()):
+                comments.append(self._comment(comment, post.pk, users, line_number, now))
+        existing = set(Post.objects.filter(
+            pk__in={_as_int(record['post_id']) for _, record in batch.comments}
+        ).values_list('pk', flat=True)) if batch.comments else set()
+        for line_number, record in batch.comments:
+            if _as_int(record['post_id']) not in existing:
+                raise InvalidImportData(f'line {line_number}: unknown post {record["post_id"]!r}')
+            comments.append(self._comment(record, _as_int(record['post_id']), users, line_number, now))
+        Comment.objects.bulk_create(comments)
+
+        index_new_posts(
+            (post, list(dict.fromkeys(record.get('tags', ()))))
+            for post, (_, record) in zip(posts, batch.posts)
+        )
+        archive.add_posts(posts)
+        if posts:
+            scopes = {'site'} | {feeds.scope_key('author', record['author']) for _, record in batch.posts}
+            scopes.update(
+                feeds.scope_key('tag', slug)
+                for slug in Tag.objects.filter(pk__in=tag_ids.values()).values_list('slug', flat=True)
+            )
+            feeds.invalidate(scopes)
+        touched = {comment.post_id for comment in comments}
+        if touched:
+            counters.rebuild(Post.objects.filter(pk__in=touched))
+
+        self.stats.posts += len(posts)
+        self.stats.comments += len(comments)
+        self.stats.tag_links += len(links)
+        self.stats.batches += 1
+        if self.on_batch:
+            self.on_batch(self.stats)
+
+    def _comment(self, record, post_pk, users, line_number, now):
+        _require(record, ('author', 'content'), line_number)
+        created_at = _timestamp(record.get('created_at'), line_number, now)
+        return Comment(
+            post_id=post_pk,
+            author_id=users[record['author']],
+            content=record['content'],
+            created_at=created_at,
+            updated_at=_timestamp(record.get('updated_at'), line_number, created_at),
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.models import Post, make_excerpt
+
+
+class Command(BaseCommand):
+    help = 'Regenerate Post.excerpt from the content, e.g. after bulk writes that bypassed Post.save().'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true',
+                            help='Only fill in posts whose excerpt is empty.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Posts written per transaction (default: 1000).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        posts = Post.objects.only('pk', 'content', 'excerpt').order_by('pk')
+        if options['missing']:
+            posts = posts.filter(excerpt='').exclude(content='')
+
+        started = time.perf_counter()
+        checked = updated = 0
+        stale = []
+
+        def write():
+            with transaction.atomic():
+                Post.objects.bulk_update(stale, ['excerpt'])
+
+        for post in posts.iterator(chunk_size=batch_size):
+            checked += 1
+            excerpt = make_excerpt(post.content)
+            if excerpt != post.excerpt:
+                post.excerpt = excerpt
+                stale.append(post)
+            if len(stale) >= batch_size:
+                write()
+                updated += len(stale)
+                stale = []
+        write()
+        updated += len(stale)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} posts, updated {updated} excerpts in {time.perf_counter() - started:.2f}s.'
+        ))
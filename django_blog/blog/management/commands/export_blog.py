@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.exporter import CSV_MODELS, FORMATS, InvalidExportFilter, export_lines, filtered_posts
+
+
+class Command(BaseCommand):
+    help = 'Stream posts and comments as NDJSON or CSV to a file or standard output.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: standard output).')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--model', choices=CSV_MODELS, default='posts',
+                            help='Rows to write in CSV mode (NDJSON nests comments in posts).')
+        parser.add_argument('--author', help='Only posts by this username.')
+        parser.add_argument('--tag', help='Only posts with this tag slug.')
+        parser.add_argument('--since', help='Only posts created at or after this ISO date/datetime.')
+        parser.add_argument('--until', help='Only posts created before this ISO date/datetime.')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Posts read per database round trip (default: 500).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        try:
+            posts = filtered_posts(options['author'], options['tag'], options['since'], options['until'])
+            lines = export_lines(posts, options['format'], options['model'], options['chunk_size'])
+        except InvalidExportFilter as e:
+            raise CommandError(str(e))
+
+        path = options['output']
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.writelines(lines)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog import fragment_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the per-post fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters afterwards.')
+
+    def handle(self, *args, **options):
+        stats = fragment_cache.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            fragment_cache.reset_stats()
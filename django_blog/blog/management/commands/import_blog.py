@@ -0,0 +1,48 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.importer import BlogImporter, InvalidImportData, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = 'Bulk import posts, comments and tags from a JSONL or CSV file (use "-" for stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or "-" to read standard input.')
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help='Input format; defaults to the file extension, or jsonl for stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Records written per transaction (default: 1000).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        started = time.perf_counter()
+
+        def progress(stats):
+            if options['verbosity'] >= 2:
+                rate = stats.rows / (time.perf_counter() - started)
+                self.stdout.write(f'Batch {stats.batches}: {stats.rows} rows ({rate:,.0f} rows/s)')
+
+        importer = BlogImporter(batch_size=options['batch_size'], on_batch=progress)
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            stats = importer.run(read_csv(stream) if fmt == 'csv' else read_jsonl(stream))
+        except InvalidImportData as e:
+            done = importer.stats
+            raise CommandError(f'{e} (committed {done.posts} posts and {done.comments} comments before it)')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.posts} posts, {stats.comments} comments and {stats.tag_links} tag links '
+            f'({stats.tags_created} new tags) in {elapsed:.2f}s '
+            f'({stats.rows / elapsed if elapsed else 0:,.0f} rows/s).'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.archive import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-author, per-month archive buckets from the posts.'
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} archive buckets.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.counters import drifted_posts, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post.comment_count and Post.last_comment_at from the comments table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report posts whose counters have drifted; exit 1 if any.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drifted = list(drifted_posts().values_list('pk', 'comment_count', 'actual_count'))
+            for pk, stored, actual in drifted:
+                self.stdout.write(f'Post {pk}: stored {stored} comments, actually {actual}')
+            if drifted:
+                raise CommandError(f'{len(drifted)} post(s) have drifted comment counters.')
+            self.stdout.write(self.style.SUCCESS('All comment counters are consistent.'))
+            return
+
+        updated = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt comment counters for {updated} posts.'))
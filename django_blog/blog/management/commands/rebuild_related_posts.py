@@ -0,0 +1,23 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related-posts table from the posts\' tags.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help=f'Worker processes for scoring (this machine has {os.cpu_count()} CPUs).')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Posts scored per task handed to a worker (default: 1000).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild(processes=max(options['processes'], 1), chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} related-post links in {time.perf_counter() - started:.2f}s.'
+        ))
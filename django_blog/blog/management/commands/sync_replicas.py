@@ -0,0 +1,42 @@
+import sqlite3
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.routers import replicas
+
+
+def _sqlite_path(name):
+    # Replicas are usually opened read-only through a "file:...?mode=ro" URI.
+    name = str(name)
+    return urlsplit(name).path if name.startswith('file:') else name
+
+
+class Command(BaseCommand):
+    help = ('Copy the default SQLite database over each SQLite replica in BLOG_DB_REPLICAS '
+            '(a local stand-in for real replication).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replicas to refresh (default: all).')
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas only copies SQLite databases.')
+        aliases = options['aliases'] or list(replicas())
+        if not aliases:
+            raise CommandError('No replicas are configured (BLOG_DB_REPLICAS is empty).')
+
+        primary.ensure_connection()
+        for alias in aliases:
+            if alias not in replicas():
+                raise CommandError(f'{alias!r} is not listed in BLOG_DB_REPLICAS.')
+            connections[alias].close()  # drop any read-only handle on the old copy
+            path = _sqlite_path(connections[alias].settings_dict['NAME'])
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'Copied default to {alias} ({path}).'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Show how often buffered post views were flushed and what the flushes cost.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters afterwards.')
+
+    def handle(self, *args, **options):
+        stats = view_counter.stats()
+        self.stdout.write(
+            f"flushes: {stats['flushes']}  failed: {stats['failed_flushes']}  "
+            f"failed expiries: {stats['failed_expiries']}  "
+            f"views: {stats['flushed_views']}  post rows: {stats['flushed_posts']}  "
+            f"mean flush: {stats['mean_flush_ms']:.2f} ms"
+        )
+        if options['reset']:
+            view_counter.reset_stats()
@@ -0,0 +1,37 @@
+"""Request-scoped database routing hints; see ``blog.routers``."""
+from django.conf import settings
+
+from .routers import PIN_COOKIE, replicas, use_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PrimaryPinningMiddleware:
+    """
+    Serve a client from the primary database for a short while after it writes.
+
+    Writes mark the client with a short-lived cookie; requests carrying it
+    (and the writes themselves) read from ``default``, so readers see their
+    own changes even when the replicas have not caught up yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+
+        writing = request.method not in SAFE_METHODS
+        if writing or PIN_COOKIE in request.COOKIES:
+            with use_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        if writing:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'BLOG_REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_comments_changed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=200)),
+                ('format', models.CharField(max_length=8)),
+                ('host', models.CharField(max_length=255)),
+                ('body', models.BinaryField()),
+                ('body_gzip', models.BinaryField()),
+                ('etag', models.CharField(max_length=32)),
+                ('last_modified', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'format', 'host'), name='blog_feeddocument_uniq')],
+            },
+        ),
+    ]
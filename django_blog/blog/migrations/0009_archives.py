@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_archive_buckets(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    ArchiveBucket = apps.get_model('blog', 'ArchiveBucket')
+    counts = Counter()
+    for author_id, created_at in Post.objects.values_list('author_id', 'created_at').iterator():
+        local = timezone.localtime(created_at)
+        counts[author_id, local.year, local.month] += 1
+    ArchiveBucket.objects.bulk_create([
+        ArchiveBucket(author_id=author_id, year=year, month=month, post_count=count)
+        for (author_id, year, month), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_related_posts'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'created_at', 'id'], name='blog_post_author_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivebucket',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='archivebucket',
+            constraint=models.UniqueConstraint(fields=('author', 'year', 'month'), name='blog_archivebucket_uniq'),
+        ),
+        migrations.RunPython(backfill_archive_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+"""
+Ownership checks for the edit and delete views.
+
+``OwnerRequiredMixin`` fetches the object with the ownership test folded into
+the query (``filter(pk=..., author=request.user)``) and keeps it for the rest
+of the request, so the permission check and the generic view share a single
+lookup. Only a refused request pays for a second, narrow query to tell a
+missing object (404) from someone else's (redirect with a message).
+"""
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import Http404
+from django.shortcuts import redirect
+
+_UNRESOLVED = object()
+
+
+class OwnerRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
+    owner_field = 'author'
+    # Column holding the post to send refused users back to.
+    denied_post_field = 'pk'
+
+    def _resolve(self):
+        if getattr(self, '_owned_object', _UNRESOLVED) is _UNRESOLVED:
+            self._owned_object = self.get_owned_object()
+        return self._owned_object
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        obj = self._resolve()
+        if obj is None:
+            raise Http404(f'No {self.model._meta.verbose_name} owned by you matches the given query.')
+        return obj
+
+    def get_owned_object(self):
+        """The requested object if the current user owns it, else None."""
+        user = self.request.user
+        if not user.is_authenticated:
+            return None
+        queryset = self.get_queryset().filter(pk=self.kwargs[self.pk_url_kwarg], **{self.owner_field: user})
+        obj = next(iter(queryset.order_by()[:1]), None)
+        if obj is not None:
+            setattr(obj, self.owner_field, user)  # known to be the owner; saves loading it again
+        return obj
+
+    def test_func(self):
+        return self._resolve() is not None
+
+    def handle_no_permission(self):
+        post_pk = (
+            self.model._default_manager.filter(pk=self.kwargs[self.pk_url_kwarg])
+            .values_list(self.denied_post_field, flat=True).first()
+        )
+        if post_pk is None:
+            raise Http404(f'No {self.model._meta.verbose_name} found matching the query')
+        messages.error(self.request, self.get_permission_denied_message())
+        return redirect('blog:post_detail', pk=post_pk)
@@ -1,25 +1,60 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils.text import Truncator
 from taggit.managers import TaggableManager
 
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content):
+    # Same output as the ``truncatechars:200`` the list cards used to apply.
+    return Truncator(content).chars(EXCERPT_LENGTH)
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Regenerated from content on save, so list pages can leave content unread
+    excerpt = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed by blog_post_author_created_idx, whose leading column serves
+    # plain author lookups as well.
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     # TaggableManager provides the many-to-many relationship for tags
     tags = TaggableManager() 
+    # Denormalised from Comment by blog.counters so pages never have to count
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_comment_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Moves on every comment create, edit or delete; part of the page validators
+    comments_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Flushed in batches by blog.view_counter, so it trails the live count a little
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'content' not in self.get_deferred_fields() and (update_fields is None or 'content' in update_fields):
+            self.excerpt = make_excerpt(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('blog:post_detail', kwargs={'pk': self.pk})
 
     class Meta:
-        ordering = ['-created_at']
+        # 'id' breaks ties between posts created in the same instant so that
+        # keyset pagination (blog.pagination) has a unique position per row.
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='blog_post_created_id_idx'),
+            # Author archives: filter on the author, read in list order
+            models.Index(fields=['author', 'created_at', 'id'], name='blog_post_author_created_idx'),
+        ]
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -29,7 +64,133 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['created_at']
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Serves keyset pages of one post's thread (see PostDetailView)
+            models.Index(fields=['post', 'created_at', 'id'], name='blog_comment_thread_idx'),
+        ]
+
+    def __str__(self):
+        return f'Comment by {self.author.username} on {self.post.title}'
+
+
+# --- Search Index ---
+class SearchTerm(models.Model):
+    """A normalised token together with the number of posts that contain it."""
+    term = models.CharField(max_length=64, unique=True)
+    document_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.term
+
+
+class SearchPosting(models.Model):
+    """One entry of the inverted index: a term occurring in a post."""
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='postings')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_postings')
+    # Field-boosted, log-damped term frequency computed by blog.search
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'post'], name='blog_searchposting_term_post_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} in post {self.post_id}'
+
+
+# --- Syndication Feeds ---
+class FeedDocument(models.Model):
+    """
+    A rendered RSS or Atom feed, stored until a post it covers changes.
+
+    ``scope`` is ``site``, ``tag:<slug>`` or ``author:<username>``; feeds are
+    rendered per host because their links are absolute. See ``blog.feeds``.
+    """
+    scope = models.CharField(max_length=200)
+    format = models.CharField(max_length=8)
+    host = models.CharField(max_length=255)
+    body = models.BinaryField()
+    body_gzip = models.BinaryField()
+    etag = models.CharField(max_length=32)
+    last_modified = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'format', 'host'], name='blog_feeddocument_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.format} feed for {self.scope} on {self.host}'
+
+
+# --- Related Posts ---
+class RelatedPost(models.Model):
+    """One of a post's most similar posts by shared tags, kept by blog.related."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    # Jaccard similarity of the two posts' tag sets
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index that serves a detail page's lookup, in rank order
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_post_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.related_id} related to {self.post_id} ({self.score:.2f})'
+
+
+# --- Archives ---
+class ArchiveBucket(models.Model):
+    """Number of posts an author published in a month, kept by blog.archive."""
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'year', 'month'], name='blog_archivebucket_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.author_id} {self.year}-{self.month:02d}: {self.post_count}'
+
+
+# --- View Counts ---
+class PostViewDay(models.Model):
+    """Views of a post on one day; the rows still inside the window feed PostViewWindow."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'day'], name='blog_postviewday_uniq'),
+        ]
+        indexes = [
+            # Expiry reads the days that fell out of the window
+            models.Index(fields=['day'], name='blog_postviewday_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} on {self.day}: {self.views}'
+
+
+class PostViewWindow(models.Model):
+    """Running total of a post's views over the last BLOG_POPULAR_WINDOW_DAYS days."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The leaderboard reads the top of this index
+            models.Index(fields=['views', 'post'], name='blog_postviewwindow_rank_idx'),
+        ]
 
     def __str__(self):
-        return f'Comment by {self.author.username} on {self.post.title}'
\ No newline at end of file
+        return f'{self.post_id}: {self.views}'
@@ -0,0 +1,183 @@
+"""
+Whole-page cache for the blog's read views, with holes for per-user markup.
+
+Everything on the list, archive and detail pages is the same for every
+reader except a few spots: the login/logout links, flash messages, the
+edit/delete links shown to an author and the comment form with its CSRF
+token. Templates mark those with ``{% hole %}``. When ``cached_page``
+renders a page for the cache, each hole is written out as a placeholder
+comment instead; the stored page is therefore the same for all users, and
+every response (hit or miss) is finished by ``fill_holes``, which renders
+just the small hole templates for the current request.
+
+Placeholders carry a random nonce drawn for that render and stored with the
+page, so only the ones ``{% hole %}`` wrote are filled: a post that contains
+placeholder-like text (in its excerpt, say) is served as written.
+
+Entries are keyed on the ``blog.content_version`` token, host and full URL,
+so any post, comment or tag write retires them all at once, whichever worker
+or management command made it; the rest age out after
+``BLOG_PAGE_CACHE_SECONDS`` (0 turns the cache off), which also bounds how
+stale the view counts on a cached page can be. Filled responses carry
+``Vary: Cookie``, because the holes depend on the session.
+
+The pages and the token must live in a cache that every process shares (see
+``CACHES`` in the settings: Redis, or the file cache for one machine). With
+a per-process cache such as LocMemCache, a worker would keep serving its own
+pages after writes made elsewhere.
+
+A page rendered from a lagging read replica would be stored under the new
+version and outlive the write it is missing, so for
+``BLOG_REPLICA_PIN_SECONDS`` after a version change misses are rendered from
+the primary (see ``blog.routers``).
+"""
+import hashlib
+import re
+import secrets
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import wraps
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from . import content_version
+from .forms import CommentForm
+from .routers import replicas, use_primary
+
+KEY_PREFIX = 'blog:page2'  # entries are (body, content_type, nonce)
+STATUS_HEADER = 'X-Page-Cache'
+
+_holes = {}
+
+
+def timeout():
+    return getattr(settings, 'BLOG_PAGE_CACHE_SECONDS', 0)
+
+
+# --- Holes ---
+def hole(name):
+    """Register ``fn(request, *args)`` as the renderer of hole ``name``."""
+    def register(fn):
+        _holes[name] = fn
+        return fn
+    return register
+
+
+@hole('nav')
+def _nav(request):
+    return render_to_string('blog/holes/nav.html', request=request)
+
+
+@hole('messages')
+def _messages(request):
+    return render_to_string('blog/holes/messages.html', request=request)
+
+
+@hole('comment_form')
+def _comment_form(request, post_pk):
+    return render_to_string(
+        'blog/holes/comment_form.html', {'post_pk': post_pk, 'comment_form': CommentForm()}, request=request,
+    )
+
+
+OWNER_ACTIONS = {'post', 'post_detail', 'comment'}
+
+
+@hole('owner_actions')
+def _owner_actions(request, kind, pk, author_pk):
+    # Most readers own nothing on the page; they skip the render entirely.
+    if kind not in OWNER_ACTIONS or not request.user.is_authenticated or request.user.pk != int(author_pk):
+        return ''
+    return render_to_string(f'blog/holes/{kind}_actions.html', {'pk': pk}, request=request)
+
+
+def render_hole(request, name, args):
+    return _holes[name](request, *args)
+
+
+def punching(request):
+    """The marker nonce while ``request`` is rendering a page for the cache, else None."""
+    return getattr(request, '_blog_hole_nonce', None)
+
+
+def marker(nonce, name, args):
+    return '<!--blog:hole:{} {}-->'.format(nonce, ' '.join(quote(str(part), safe='') for part in (name, *args)))
+
+
+def fill_holes(content, request, nonce):
+    """Fill the holes marked with ``nonce``; anything unknown or malformed is left as is."""
+    def fill(match):
+        name, *args = (unquote(part) for part in match.group(1).split(' '))
+        if name not in _holes:
+            return match.group(0)
+        try:
+            return render_hole(request, name, args)
+        except (TypeError, ValueError):  # wrong number or type of arguments
+            return match.group(0)
+    return re.sub(rf'<!--blog:hole:{re.escape(nonce)} ([^>]*?)-->', fill, content)
+
+
+# --- Page cache ---
+def page_key(request):
+    url = f'{request.scheme}://{request.get_host()}{request.get_full_path()}'
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{content_version.current()}:{digest}'
+
+
+def _cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def _replicas_may_lag():
+    if not replicas():
+        return False
+    lag = timedelta(seconds=getattr(settings, 'BLOG_REPLICA_PIN_SECONDS', 10))
+    return timezone.now() - content_version.changed_at() < lag
+
+
+def cached_page(view):
+    """Serve GET/HEAD responses of ``view`` from the page cache, filling holes per request."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        seconds = timeout()
+        if not seconds or request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            body, content_type, nonce = entry
+            response = HttpResponse(content_type=content_type)
+            status = 'hit'
+        else:
+            nonce = request._blog_hole_nonce = secrets.token_hex(8)
+            try:
+                with use_primary() if _replicas_may_lag() else nullcontext():
+                    response = view(request, *args, **kwargs)
+                    if hasattr(response, 'render') and callable(response.render):
+                        response = response.render()
+            finally:
+                request._blog_hole_nonce = None
+            if response.streaming:
+                return response
+            body = response.content.decode(response.charset)
+            if _cacheable(response):
+                cache.set(key, (body, response['Content-Type'], nonce), seconds)
+            status = 'miss'
+
+        response.content = fill_holes(body, request, nonce)
+        response[STATUS_HEADER] = status
+        patch_vary_headers(response, ['Cookie'])
+        return response
+    return wrapper
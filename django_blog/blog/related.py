@@ -0,0 +1,191 @@
+"""
+Precomputed "related posts": each post's top ``BLOG_RELATED_POSTS`` posts by
+Jaccard similarity of their tag sets, stored in ``RelatedPost``.
+
+``rebuild()`` (the ``rebuild_related_posts`` command) recomputes the whole
+table from one read of taggit's ``TaggedItem`` rows, optionally spreading the
+scoring over several processes. The receivers in ``blog.signals`` keep it
+current as posts are re-tagged or deleted via ``update_posts()``:
+
+* the changed posts, and every post that listed one of them, are recomputed
+  exactly (a listed post's score may have dropped below a newcomer's);
+* every other post sharing a tag with a changed post can only gain it, so the
+  changed post is merged into its list if it beats the last entry.
+
+Bulk writes that skip signals (``import_blog``, tag deletion) are caught up
+by the next rebuild.
+"""
+import heapq
+import multiprocessing
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from taggit.models import TaggedItem
+
+from . import content_version
+from .models import Post, RelatedPost
+
+
+def related_count():
+    return getattr(settings, 'BLOG_RELATED_POSTS', 5)
+
+
+def _tagged_items():
+    return TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+
+
+def _group(rows):
+    tag_sets = defaultdict(set)
+    for post_id, tag_id in rows:
+        tag_sets[post_id].add(tag_id)
+    return tag_sets
+
+
+def _tag_sets_sharing(tag_ids, exclude=()):
+    """Full tag sets of every post carrying at least one of ``tag_ids``."""
+    items = _tagged_items().exclude(object_id__in=exclude)
+    sharing = items.filter(tag_id__in=tag_ids).values('object_id')
+    return _group(items.filter(object_id__in=sharing).values_list('object_id', 'tag_id'))
+
+
+def _invert(tag_sets):
+    posts_by_tag = defaultdict(list)
+    for post_id, tags in tag_sets.items():
+        for tag_id in tags:
+            posts_by_tag[tag_id].append(post_id)
+    return posts_by_tag
+
+
+def jaccard(a, b):
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+def top_related(post_id, tag_sets, posts_by_tag, n):
+    """``[(related_id, score), ...]`` best first; newer posts win ties."""
+    tags = tag_sets.get(post_id)
+    if not tags:
+        return []
+    overlap = Counter()
+    for tag_id in tags:
+        overlap.update(posts_by_tag[tag_id])
+    del overlap[post_id]
+    size = len(tags)
+    scored = (
+        (shared / (size + len(tag_sets[other]) - shared), other)
+        for other, shared in overlap.items()
+    )
+    return [(other, score) for score, other in heapq.nlargest(n, scored)]
+
+
+def _rows(post_id, ranked):
+    return [
+        RelatedPost(post_id=post_id, related_id=other, score=score, rank=rank)
+        for rank, (other, score) in enumerate(ranked)
+    ]
+
+
+# --- Bulk rebuild ---
+_worker_state = {}
+
+
+def _init_worker(tag_sets, n):
+    _worker_state.update(tag_sets=tag_sets, posts_by_tag=_invert(tag_sets), n=n)
+
+
+def _score_chunk(post_ids):
+    state = _worker_state
+    return [(pk, top_related(pk, state['tag_sets'], state['posts_by_tag'], state['n'])) for pk in post_ids]
+
+
+def rebuild(processes=1, chunk_size=1000, batch_size=5000):
+    """Recompute every post's related posts. Returns the number of rows written."""
+    n = related_count()
+    tag_sets = dict(_group(_tagged_items().values_list('object_id', 'tag_id').iterator(chunk_size=10_000)))
+    post_ids = sorted(tag_sets)
+    chunks = [post_ids[i:i + chunk_size] for i in range(0, len(post_ids), chunk_size)]
+
+    if processes > 1 and len(chunks) > 1:
+        # Workers only score; all database access stays in this process.
+        pool = multiprocessing.get_context().Pool(processes, _init_worker, (tag_sets, n))
+        results = pool.imap_unordered(_score_chunk, chunks)
+    else:
+        pool = None
+        _init_worker(tag_sets, n)
+        results = map(_score_chunk, chunks)
+
+    written = 0
+    try:
+        with transaction.atomic():
+            RelatedPost.objects.all().delete()
+            pending = []
+            for chunk in results:
+                for pk, ranked in chunk:
+                    pending.extend(_rows(pk, ranked))
+                if len(pending) >= batch_size:
+                    RelatedPost.objects.bulk_create(pending)
+                    written += len(pending)
+                    pending = []
+            RelatedPost.objects.bulk_create(pending)
+            written += len(pending)
+    finally:
+        _worker_state.clear()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    content_version.bump()  # detail pages list the new related posts
+    return written
+
+
+# --- Incremental maintenance (called from blog.signals) ---
+def listing_posts(post_ids):
+    """Posts whose stored related list includes any of ``post_ids``."""
+    return set(RelatedPost.objects.filter(related_id__in=post_ids).values_list('post_id', flat=True))
+
+
+def _exact(post_ids, exclude=()):
+    """Recompute ``post_ids`` from scratch: ``{post_id: [(related_id, score), ...]}``."""
+    own = _group(_tagged_items().filter(object_id__in=post_ids).values_list('object_id', 'tag_id'))
+    tag_sets = _tag_sets_sharing({tag for tags in own.values() for tag in tags}, exclude)
+    posts_by_tag = _invert(tag_sets)
+    n = related_count()
+    return {pk: top_related(pk, tag_sets, posts_by_tag, n) for pk in post_ids}
+
+
+@transaction.atomic
+def update_posts(changed, also_recompute=(), deleted=()):
+    """
+    Bring the table up to date after the tags of the ``changed`` posts moved.
+
+    ``also_recompute`` lists posts to recompute exactly regardless, e.g. the
+    posts that listed one of the ``deleted`` posts. Deleted posts are left
+    out even if their tag rows have not been removed yet.
+    """
+    changed = set(changed)
+    n = related_count()
+    exact = changed | listing_posts(changed) | set(also_recompute)
+    lists = _exact(exact, exclude=deleted)
+
+    # Everyone else who shares a tag with a changed post may gain it.
+    changed_tags = _group(_tagged_items().filter(object_id__in=changed).values_list('object_id', 'tag_id'))
+    tag_sets = _tag_sets_sharing({tag for tags in changed_tags.values() for tag in tags})
+    gaining = set(tag_sets) - exact
+    current = defaultdict(list)
+    for post_id, related_id, score in (
+        RelatedPost.objects.filter(post_id__in=gaining).order_by('post_id', 'rank')
+        .values_list('post_id', 'related_id', 'score')
+    ):
+        current[post_id].append((related_id, score))
+    for post_id in gaining:
+        merged = current[post_id] + [
+            (other, jaccard(tag_sets[post_id], changed_tags[other])) for other in changed_tags
+        ]
+        ranked = heapq.nlargest(n, ((score, other) for other, score in merged if score > 0))
+        ranked = [(other, score) for score, other in ranked]
+        if ranked != current[post_id]:
+            lists[post_id] = ranked
+
+    RelatedPost.objects.filter(post_id__in=lists).delete()
+    RelatedPost.objects.bulk_create([row for pk, ranked in lists.items() for row in _rows(pk, ranked)])
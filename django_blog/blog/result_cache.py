@@ -0,0 +1,92 @@
+"""
+In-process cache of search and tag listing results.
+
+``PostListView`` stores, per normalised query, tag, page position and
+``blog.content_version`` token, the ordered ids of the posts on that page
+plus what is needed to rebuild the paginator. A content write bumps the
+version, which retires every stored entry at once; stale entries are never
+looked up again and age out through LRU eviction. The token is read from the
+shared cache, so writes made by other processes retire entries here too;
+``BLOG_SEARCH_CACHE_SECONDS`` still bounds an entry's life, in case a
+version bump is ever lost (an evicted or flushed cache, say).
+
+Concurrent misses on the same key are collapsed: the first request computes
+the entry while the others wait for it, so a cold popular query runs once.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ResultCache:
+    def __init__(self, max_entries, ttl=None, wait_timeout=10.0):
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds an entry is served for; None keeps it until evicted
+        self.wait_timeout = wait_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        # Caller holds the lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Return the entry for ``key``, calling ``compute()`` at most once per miss."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            event = self._in_flight.get(key)
+            leader = event is None
+            if leader:
+                event = self._in_flight[key] = threading.Event()
+                self.misses += 1
+
+        if not leader:
+            event.wait(self.wait_timeout)
+            with self._lock:
+                value = self._lookup(key)
+            # If the leader failed (or is very slow), fall back to computing here.
+            return value if value is not None else compute()
+
+        try:
+            value = compute()
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            with self._lock:
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+search_results = ResultCache(
+    max_entries=getattr(settings, 'BLOG_SEARCH_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'BLOG_SEARCH_CACHE_SECONDS', 60),
+)
@@ -0,0 +1,101 @@
+"""
+Read-replica routing for the blog's tables.
+
+``ReplicaRouter`` sends reads of the ``blog`` and ``taggit`` models to one of
+the aliases in ``BLOG_DB_REPLICAS`` (``{alias: weight}``), chosen at random
+in proportion to its weight, and every write to ``default``. Sessions, users
+and the other contrib apps stay on ``default``.
+
+A replica that cannot be connected to is skipped for
+``BLOG_REPLICA_RETRY_SECONDS``; with none left, reads fall back to
+``default``. Replicas lag behind the primary, so ``PrimaryPinningMiddleware``
+keeps a client on ``default`` for ``BLOG_REPLICA_PIN_SECONDS`` after it
+writes anything (e.g. the redirect after posting a comment shows the new
+comment); ``use_primary()`` does the same for code outside a request, and
+reads inside an open transaction on ``default`` always stay there. For the
+same stretch after any content write, ``blog.page_cache`` renders its misses
+from ``default`` so that a lagging replica's page is never cached.
+
+With no replicas configured the router leaves everything on ``default``.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+PIN_COOKIE = 'blog_primary'
+
+_pinned = ContextVar('blog_db_pinned', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Route reads inside the block to ``default``."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def replicas():
+    return getattr(settings, 'BLOG_DB_REPLICAS', {})
+
+
+class ReplicaRouter:
+    route_app_labels = {'blog', 'taggit'}
+
+    def __init__(self):
+        self._down_until = {}  # alias -> monotonic time to retry it
+
+    def _available(self, alias):
+        retry_at = self._down_until.get(alias)
+        if retry_at is not None and time.monotonic() < retry_at:
+            return False
+        try:
+            connections[alias].ensure_connection()  # a no-op once connected
+        except OperationalError:
+            retry = getattr(settings, 'BLOG_REPLICA_RETRY_SECONDS', 30)
+            self._down_until[alias] = time.monotonic() + retry
+            return False
+        self._down_until.pop(alias, None)
+        return True
+
+    def choose_replica(self):
+        candidates = dict(replicas())
+        while candidates:
+            aliases = list(candidates)
+            alias = random.choices(aliases, weights=[candidates[a] for a in aliases])[0]
+            if self._available(alias):
+                return alias
+            del candidates[alias]
+        return DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels or _pinned.get() or not replicas():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # a read inside a write transaction must see that transaction
+        return self.choose_replica()
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            # Explicit, so that saving an object read from a replica
+            # does not follow its instance hint back to the replica.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary (see the sync_replicas command).
+        if db in replicas():
+            return False
+        return None
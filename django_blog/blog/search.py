@@ -0,0 +1,214 @@
+"""
+Inverted-index search for blog posts.
+
+Every post is tokenised into ``SearchTerm``/``SearchPosting`` rows when it is
+saved or re-tagged (see ``blog.signals``), so a ``?q=`` lookup only reads the
+postings of the query terms instead of running ``LIKE`` over every post body.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Max, Sum, Value, When
+
+from .models import Post, SearchPosting, SearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+
+# Very common English words carry no ranking signal and have huge postings.
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'to', 'was',
+    'were', 'will', 'with',
+})
+
+# Occurrences in the title count more than tags, tags more than the body.
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'content': 1.0,
+}
+
+
+def tokenize(text):
+    """Split text into lower-cased index terms, dropping stop words."""
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def normalize_query(query):
+    """Canonical form of a query: the same terms give the same results in any order."""
+    return ' '.join(sorted(set(tokenize(query))))
+
+
+def document_weights(post, tag_names=None):
+    """Return ``{term: weight}`` for a post's title, tag names and content."""
+    if tag_names is None:
+        tag_names = [tag.name for tag in post.tags.all()]
+    fields = {
+        'title': post.title,
+        'tags': ' '.join(tag_names),
+        'content': post.content,
+    }
+    frequencies = Counter()
+    for field, text in fields.items():
+        for token in tokenize(text):
+            frequencies[token] += FIELD_WEIGHTS[field]
+    # Log damping keeps a word repeated fifty times from drowning out the title.
+    return {term: 1.0 + math.log(frequency) for term, frequency in frequencies.items()}
+
+
+@transaction.atomic
+def index_post(post):
+    """(Re)build the postings of a single post, adjusting document counts."""
+    weights = document_weights(post)
+    old_terms = set(
+        SearchPosting.objects.filter(post=post).values_list('term__term', flat=True)
+    )
+    added = weights.keys() - old_terms
+    removed = old_terms - weights.keys()
+
+    if removed:
+        SearchPosting.objects.filter(post=post, term__term__in=removed).delete()
+        SearchTerm.objects.filter(term__in=removed).update(document_count=F('document_count') - 1)
+
+    if added:
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(term=term) for term in added], ignore_conflicts=True
+        )
+        SearchTerm.objects.filter(term__in=added).update(document_count=F('document_count') + 1)
+
+    term_ids = dict(SearchTerm.objects.filter(term__in=weights).values_list('term', 'id'))
+    SearchPosting.objects.bulk_create(
+        [
+            SearchPosting(term_id=term_ids[term], post=post, weight=weight)
+            for term, weight in weights.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['term', 'post'],
+        update_fields=['weight'],
+    )
+
+
+@transaction.atomic
+def index_new_posts(posts_with_tags):
+    """
+    Index many freshly inserted posts at once, e.g. after ``bulk_create``.
+
+    ``posts_with_tags`` is an iterable of ``(post, tag_names)``; the posts must
+    not have postings yet.
+    """
+    weights = {post.pk: document_weights(post, tag_names) for post, tag_names in posts_with_tags}
+    document_increments = Counter(term for post_weights in weights.values() for term in post_weights)
+    if not document_increments:
+        return
+
+    SearchTerm.objects.bulk_create(
+        [SearchTerm(term=term) for term in document_increments], ignore_conflicts=True
+    )
+    by_increment = {}
+    for term, increment in document_increments.items():
+        by_increment.setdefault(increment, []).append(term)
+    for increment, terms in by_increment.items():
+        SearchTerm.objects.filter(term__in=terms).update(document_count=F('document_count') + increment)
+
+    term_ids = dict(SearchTerm.objects.filter(term__in=document_increments).values_list('term', 'id'))
+    SearchPosting.objects.bulk_create([
+        SearchPosting(term_id=term_ids[term], post_id=post_pk, weight=weight)
+        for post_pk, post_weights in weights.items()
+        for term, weight in post_weights.items()
+    ], batch_size=1000)
+
+
+def unindex_post(post):
+    """Release a post's terms; its postings are removed by the FK cascade."""
+    SearchTerm.objects.filter(postings__post=post).update(document_count=F('document_count') - 1)
+
+
+def rebuild_index(batch_size=500):
+    """Drop and regenerate the whole index. Returns the number of posts indexed."""
+    SearchPosting.objects.all().delete()
+    SearchTerm.objects.all().delete()
+    indexed = 0
+    posts = Post.objects.order_by('pk').prefetch_related('tags')
+    for post in posts.iterator(chunk_size=batch_size):
+        index_post(post)
+        indexed += 1
+    return indexed
+
+
+def _term_counts(terms):
+    return SearchTerm.objects.filter(term__in=terms, document_count__gt=0).values_list('id', 'document_count')
+
+
+# The highest primary key is an index lookup and a close enough stand-in for
+# the post count, which would need a full COUNT(*).
+_TOTAL = {'total': Max('pk')}
+
+
+def search_stats(query):
+    """
+    Return ``(document_counts, total)`` for the terms of ``query``, or None
+    when no post can match (no terms, or a term that appears nowhere).
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return None
+    document_counts = dict(_term_counts(terms))
+    if len(document_counts) < len(terms):
+        return None
+    return document_counts, Post.objects.order_by().aggregate(**_TOTAL)['total'] or 1
+
+
+async def asearch_stats(query):
+    """``search_stats()`` for async views."""
+    terms = set(tokenize(query))
+    if not terms:
+        return None
+    document_counts = {term_id: count async for term_id, count in _term_counts(terms)}
+    if len(document_counts) < len(terms):
+        return None
+    return document_counts, (await Post.objects.order_by().aaggregate(**_TOTAL))['total'] or 1
+
+
+_UNSET = object()
+
+
+def search_posts(queryset, query, stats=_UNSET):
+    """
+    Filter ``queryset`` down to posts containing every term of ``query``.
+
+    Results are annotated with ``search_rank`` (a TF-IDF score) and ordered by
+    it, newest first among equal scores. ``stats`` may carry a precomputed
+    ``search_stats(query)`` result; async callers fetch it with
+    ``asearch_stats``.
+    """
+    if stats is _UNSET:
+        stats = search_stats(query)
+    if stats is None:
+        # No terms, or one appears nowhere, so no post can contain them all.
+        return queryset.none()
+    document_counts, total = stats
+    rank = Sum(
+        Case(
+            *[
+                When(
+                    search_postings__term_id=term_id,
+                    then=Value(math.log(1.0 + total / count)) * F('search_postings__weight'),
+                )
+                for term_id, count in document_counts.items()
+            ],
+            output_field=FloatField(),
+        )
+    )
+    return (
+        queryset.filter(search_postings__term_id__in=document_counts)
+        .annotate(search_rank=rank, matched_terms=Count('search_postings'))
+        .filter(matched_terms=len(document_counts))
+        .order_by('-search_rank', '-created_at', '-id')
+    )
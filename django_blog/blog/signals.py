@@ -0,0 +1,186 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from taggit.models import Tag
+
+from . import archive, content_version, feeds, fragment_cache, related
+from .models import Comment, Post
+from .search import index_post, unindex_post
+from .tag_index import tag_index
+
+# Post.tags is a TaggableManager, so its through model is taggit's generic
+# TaggedItem and tag changes arrive as m2m_changed with that sender.
+TaggedItem = Post.tags.through
+
+
+# --- Search Index ---
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_post(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    unindex_post(instance)
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def reindex_retagged_post(sender, instance, action, pk_set=None, **kwargs):
+    if not isinstance(instance, Post) or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action != 'post_clear' and not pk_set:
+        return
+    index_post(instance)
+
+
+# --- Fragment Cache ---
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def invalidate_retagged_post_fragments(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        fragment_cache.invalidate_post(instance.pk)
+
+
+# --- Content Version ---
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_content_version(sender, **kwargs):
+    content_version.bump()
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def bump_content_version_on_retag(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        content_version.bump()
+
+
+# --- Tag Autocomplete Index ---
+# TaggedItem rows are watched directly (rather than m2m_changed) because they
+# are also removed by the cascade when a post is deleted.
+def _tags_a_post(tagged_item):
+    return tagged_item.content_type_id == ContentType.objects.get_for_model(Post).pk
+
+
+@receiver(post_save, sender=Tag)
+def index_saved_tag(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tag_index.tag_saved(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def unindex_deleted_tag(sender, instance, **kwargs):
+    tag_index.tag_deleted(instance.pk)
+
+
+@receiver(post_save, sender=TaggedItem)
+def count_tag_use(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and _tags_a_post(instance):
+        tag_index.usage_changed(instance.tag_id, 1)
+
+
+@receiver(post_delete, sender=TaggedItem)
+def uncount_tag_use(sender, instance, **kwargs):
+    if _tags_a_post(instance):
+        tag_index.usage_changed(instance.tag_id, -1)
+
+
+# --- Syndication Feeds ---
+@receiver(post_save, sender=Post)
+def invalidate_feeds_of_saved_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feeds.invalidate(feeds.post_scopes(instance, with_tags=True))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feeds_of_deleted_post(sender, instance, **kwargs):
+    # Its tags' feeds follow from the TaggedItem rows deleted with it.
+    feeds.invalidate(feeds.post_scopes(instance))
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def invalidate_feeds_of_retagged_post(sender, instance, action, **kwargs):
+    # Items list their categories, so the post's other feeds change too.
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        feeds.invalidate(feeds.post_scopes(instance))
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def invalidate_tag_feed(sender, instance, raw=False, **kwargs):
+    if not raw and _tags_a_post(instance):
+        slug = Tag.objects.filter(pk=instance.tag_id).values_list('slug', flat=True).first()
+        if slug is not None:  # None while the tag itself is being deleted
+            feeds.invalidate([feeds.scope_key('tag', slug)])
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_feed_of_deleted_tag(sender, instance, **kwargs):
+    feeds.invalidate([feeds.scope_key('tag', instance.slug)])
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_feeds_of_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    # Any feed may show the old name as an item category; renames are rare.
+    if not created and not raw:
+        feeds.invalidate()
+
+
+# --- Related Posts ---
+@receiver(m2m_changed, sender=TaggedItem)
+def update_related_of_retagged_post(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        related.update_posts([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_posts_listing_deleted_post(sender, instance, **kwargs):
+    instance._listed_by = related.listing_posts([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def refill_related_of_deleted_post(sender, instance, **kwargs):
+    listed_by = getattr(instance, '_listed_by', set()) - {instance.pk}
+    if listed_by:
+        # taggit may not have deleted the post's TaggedItem rows yet.
+        related.update_posts([], also_recompute=listed_by, deleted=[instance.pk])
+
+
+# --- Archive Counts ---
+@receiver(pre_save, sender=Post)
+def remember_archive_bucket(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._archive_bucket = (
+            Post.objects.filter(pk=instance.pk).values_list('author_id', 'created_at').first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new = (instance.author_id, *archive.bucket_for(instance.created_at))
+    if created:
+        archive.add(*new, 1)
+        return
+    previous = getattr(instance, '_archive_bucket', None)
+    if previous is None:
+        return
+    old = (previous[0], *archive.bucket_for(previous[1]))
+    if old != new:
+        archive.add(*old, -1)
+        archive.add(*new, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    archive.add(instance.author_id, *archive.bucket_for(instance.created_at), -1)
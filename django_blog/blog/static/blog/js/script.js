@@ -0,0 +1,110 @@
+// Lazy loading of long comment threads on the post detail page.
+// The server renders the first page of comments plus a .comment-loader
+// element holding the endpoint and the cursor of the next page; further
+// pages are fetched as that element scrolls into view.
+(function () {
+  "use strict";
+
+  function initCommentLoader(loader) {
+    var list = document.querySelector(".comment-list");
+    var loading = false;
+
+    function loadNextPage(observer) {
+      var cursor = loader.dataset.nextCursor;
+      if (loading || !cursor) {
+        return;
+      }
+      loading = true;
+      fetch(loader.dataset.url + "?cursor=" + encodeURIComponent(cursor), {
+        headers: { Accept: "application/json" },
+        credentials: "same-origin",
+      })
+        .then(function (response) {
+          if (!response.ok) {
+            throw new Error("HTTP " + response.status);
+          }
+          return response.json();
+        })
+        .then(function (page) {
+          list.insertAdjacentHTML("beforeend", page.html);
+          if (page.next_cursor) {
+            loader.dataset.nextCursor = page.next_cursor;
+            // Re-observing reports the current intersection again, so a
+            // loader that is still on screen keeps loading.
+            observer.unobserve(loader);
+            observer.observe(loader);
+          } else {
+            observer.disconnect();
+            loader.remove();
+          }
+        })
+        .catch(function () {
+          loader.textContent = "Could not load more comments.";
+          observer.disconnect();
+        })
+        .finally(function () {
+          loading = false;
+        });
+    }
+
+    var observer = new IntersectionObserver(function (entries) {
+      if (entries.some(function (entry) { return entry.isIntersecting; })) {
+        loadNextPage(observer);
+      }
+    });
+    observer.observe(loader);
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    var loader = document.querySelector(".comment-loader");
+    if (loader && "IntersectionObserver" in window && "fetch" in window) {
+      initCommentLoader(loader);
+    }
+  });
+})();
+
+// Tag suggestions on the post form. The tag input carries the endpoint in
+// data-autocomplete-url; suggestions for the tag being typed (the text after
+// the last comma) are offered through a <datalist>.
+(function () {
+  "use strict";
+
+  function initTagAutocomplete(input) {
+    var datalist = document.createElement("datalist");
+    datalist.id = input.id + "-suggestions";
+    input.setAttribute("list", datalist.id);
+    input.setAttribute("autocomplete", "off");
+    input.after(datalist);
+
+    var timer = null;
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var parts = input.value.split(",");
+        var prefix = parts.pop().trim();
+        var head = parts.map(function (part) { return part.trim(); }).filter(Boolean);
+        if (!prefix) {
+          datalist.replaceChildren();
+          return;
+        }
+        fetch(input.dataset.autocompleteUrl + "?q=" + encodeURIComponent(prefix), {
+          headers: { Accept: "application/json" },
+        })
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            datalist.replaceChildren.apply(datalist, data.results.map(function (tag) {
+              var option = document.createElement("option");
+              option.value = head.concat([tag.name]).join(", ");
+              option.label = tag.name + " (" + tag.count + ")";
+              return option;
+            }));
+          })
+          .catch(function () {});
+      }, 100);
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("input[data-autocomplete-url]").forEach(initTagAutocomplete);
+  });
+})();
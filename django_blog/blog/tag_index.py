@@ -0,0 +1,118 @@
+"""
+In-process prefix index over the tags used on blog posts.
+
+Tag names are kept in a sorted list so a prefix maps to a contiguous slice
+found with ``bisect``; the slice is ranked by how many posts use each tag.
+The index is built from taggit's ``Tag``/``TaggedItem`` tables on first use
+and then adjusted by the receivers in ``blog.signals`` as tags are created,
+renamed, deleted, attached or detached, so suggestions never query the
+database. Writes made by other processes are picked up by a periodic full
+rebuild (``BLOG_TAG_INDEX_TTL`` seconds).
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+from taggit.models import Tag, TaggedItem
+
+from .models import Post
+
+# Longer prefixes select few enough tags that ranking them is already cheap.
+MEMO_PREFIX_LENGTH = 2
+
+
+class TagPrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags = {}     # tag id -> [name, slug, usage count]
+        self._keys = []     # sorted (lower-cased name, tag id)
+        self._memo = {}     # (prefix, limit) -> result, for the short prefixes that span many tags
+        self._built_at = None
+
+    def _ensure_built(self):
+        ttl = getattr(settings, 'BLOG_TAG_INDEX_TTL', 300)
+        if self._built_at is None or time.monotonic() - self._built_at > ttl:
+            self.rebuild()
+
+    def rebuild(self):
+        post_type = ContentType.objects.get_for_model(Post)
+        counts = dict(
+            TaggedItem.objects.filter(content_type=post_type).order_by()
+            .values('tag').annotate(total=Count('id')).values_list('tag', 'total')
+        )
+        tags = {pk: [name, slug, counts.get(pk, 0)] for pk, name, slug in Tag.objects.values_list('pk', 'name', 'slug')}
+        keys = sorted((name.lower(), pk) for pk, (name, _, _) in tags.items())
+        with self._lock:
+            self._tags, self._keys, self._memo = tags, keys, {}
+            self._built_at = time.monotonic()
+
+    def suggest(self, prefix, limit=10):
+        """Return up to ``limit`` used tags starting with ``prefix``, most used first."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        self._ensure_built()
+        with self._lock:
+            memo = self._memo.get((prefix, limit))
+            if memo is not None:
+                return memo
+            start = bisect_left(self._keys, (prefix,))
+            end = bisect_left(self._keys, (prefix + '\U0010ffff',), start)
+            candidates = (self._tags[pk] for _, pk in self._keys[start:end])
+            best = heapq.nsmallest(
+                limit, (c for c in candidates if c[2] > 0), key=lambda c: (-c[2], c[0].lower(), c[0])
+            )
+            result = [{'name': name, 'slug': slug, 'count': count} for name, slug, count in best]
+            if len(prefix) <= MEMO_PREFIX_LENGTH:
+                self._memo[(prefix, limit)] = result
+        return result
+
+    # --- Incremental maintenance (called from blog.signals) ---
+    def _discard_key(self, name, tag_pk):
+        # Caller holds the lock.
+        self._memo = {}
+        key = (name.lower(), tag_pk)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def tag_saved(self, tag):
+        if self._built_at is None:
+            return  # nothing loaded yet; the first suggest() reads fresh data
+        with self._lock:
+            entry = self._tags.get(tag.pk)
+            if entry is not None:
+                self._discard_key(entry[0], tag.pk)
+                entry[0], entry[1] = tag.name, tag.slug
+            else:
+                self._tags[tag.pk] = [tag.name, tag.slug, 0]
+            insort(self._keys, (tag.name.lower(), tag.pk))
+            self._memo = {}
+
+    def tag_deleted(self, tag_pk):
+        if self._built_at is None:
+            return
+        with self._lock:
+            entry = self._tags.pop(tag_pk, None)
+            if entry is not None:
+                self._discard_key(entry[0], tag_pk)
+
+    def usage_changed(self, tag_pk, delta):
+        if self._built_at is None:
+            return
+        with self._lock:
+            entry = self._tags.get(tag_pk)
+            if entry is not None:
+                entry[2] = max(entry[2] + delta, 0)
+                self._memo = {}
+
+    def reset(self):
+        with self._lock:
+            self._tags, self._keys, self._memo, self._built_at = {}, [], {}, None
+
+
+tag_index = TagPrefixIndex()
@@ -0,0 +1,73 @@
+from django import template
+
+from blog import fragment_cache, page_cache
+
+register = template.Library()
+
+
+class PostFragmentNode(template.Node):
+    def __init__(self, nodelist, post, name):
+        self.nodelist = nodelist
+        self.post = post
+        self.name = name
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        name = self.name.resolve(context)
+        html = fragment_cache.get_fragment(post, name)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragment_cache.set_fragment(post, name, html)
+        return html
+
+
+@register.tag('cachepost')
+def do_cachepost(parser, token):
+    """
+    Cache the enclosed markup per post, e.g.::
+
+        {% cachepost post "card" %} ... {% endcachepost %}
+
+    The fragment name must be listed in ``blog.fragment_cache.FRAGMENTS`` so
+    that it is invalidated when the post changes. Keep anything that depends
+    on the current user outside the block.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a post and a fragment name")
+    nodelist = parser.parse(('endcachepost',))
+    parser.delete_first_token()
+    return PostFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
+
+
+class HoleNode(template.Node):
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def render(self, context):
+        request = context.get('request')
+        if request is None:
+            return ''
+        name = self.name.resolve(context)
+        args = [arg.resolve(context) for arg in self.args]
+        nonce = page_cache.punching(request)
+        if nonce:
+            return page_cache.marker(nonce, name, args)
+        return page_cache.render_hole(request, name, args)
+
+
+@register.tag('hole')
+def do_hole(parser, token):
+    """
+    Per-user markup that the page cache fills in for each request, e.g.::
+
+        {% hole "owner_actions" "post" post.pk post.author_id %}
+
+    The name and arguments select a renderer in ``blog.page_cache``. Keep
+    holes out of ``{% cachepost %}`` blocks, which are shared by all users.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a hole name and its arguments")
+    return HoleNode(parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
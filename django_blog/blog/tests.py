@@ -1,3 +1,1161 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, OperationalError, connection
+from django.http import Http404, HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import Truncator
+from taggit.models import Tag
+
+from . import archive, conditional, content_version, counters, fragment_cache, related
+from . import view_counter as view_counter_module
+from .async_views import AsyncPostByTagListView, AsyncPostDetailView, AsyncPostListView
+from .importer import BlogImporter
+from .middleware import PrimaryPinningMiddleware
+from .models import (
+    ArchiveBucket, Comment, FeedDocument, Post, PostViewDay, PostViewWindow, RelatedPost, SearchPosting, SearchTerm,
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .result_cache import ResultCache, search_results
+from .routers import PIN_COOKIE, ReplicaRouter, _pinned, use_primary
+from .tag_index import tag_index
+from .search import rebuild_index, search_posts, tokenize
+from .view_counter import view_counter, write_views
+from .views import PostDetailView, PostListView
+
+
+def run_elsewhere(code):
+    """Run ``code`` in a separate Django process (which shares only the cache) and return its output."""
+    result = subprocess.run(
+        [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'shell', '--no-imports', '-c', code],
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+
+    def make_post(self, title, content, tags=()):
+        post = Post.objects.create(title=title, content=content, author=self.user)
+        if tags:
+            post.tags.add(*tags)
+        return post
+
+    def search(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_tokenize_lowercases_and_drops_stop_words(self):
+        self.assertEqual(tokenize('The Django ORM, and a Query!'), ['django', 'orm', 'query'])
+
+    def test_post_is_indexed_on_save_and_reindexed_on_edit(self):
+        post = self.make_post('Django tips', 'Use select_related')
+        self.assertEqual(self.search('django'), [post])
+
+        post.title = 'Flask tips'
+        post.save()
+        self.assertEqual(self.search('django'), [])
+        self.assertEqual(self.search('flask'), [post])
+        self.assertEqual(SearchTerm.objects.get(term='django').document_count, 0)
+
+    def test_tag_changes_update_the_index(self):
+        post = self.make_post('Weekly notes', 'Nothing special')
+        post.tags.add('Performance')
+        self.assertEqual(self.search('performance'), [post])
+
+        post.tags.clear()
+        self.assertEqual(self.search('performance'), [])
+
+    def test_deleting_a_post_releases_its_terms(self):
+        post = self.make_post('Caching', 'Cache everything')
+        post.delete()
+        self.assertFalse(SearchPosting.objects.exists())
+        self.assertEqual(SearchTerm.objects.get(term='caching').document_count, 0)
+
+    def test_all_terms_must_match_and_title_hits_rank_first(self):
+        in_body = self.make_post('Notes', 'Some words about python packaging')
+        in_title = self.make_post('Python packaging', 'A short guide')
+        self.make_post('Python', 'Nothing about the other word')
+
+        self.assertEqual(self.search('packaging python'), [in_title, in_body])
+
+    def test_rebuild_index_matches_incremental_index(self):
+        self.make_post('Search engines', 'Inverted index', tags=['ir'])
+        before = set(SearchPosting.objects.values_list('term__term', 'weight'))
+        self.assertEqual(rebuild_index(), 1)
+        self.assertEqual(set(SearchPosting.objects.values_list('term__term', 'weight')), before)
+
+    def test_list_view_searches_within_tag(self):
+        tagged = self.make_post('Django search', 'Body', tags=['django'])
+        self.make_post('Django search', 'Body', tags=['other'])
+
+        request = RequestFactory().get('/tags/django/', {'q': 'search'})
+        view = PostListView()
+        view.setup(request, tag_slug='django')
+        self.assertEqual(list(view.get_queryset()), [tagged])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+        # Same created_at everywhere, so only the id tie-breaker orders them
+        Post.objects.bulk_create(
+            [Post(title=f'Post {i}', content='Body', author=self.user) for i in range(7)]
+        )
+        Post.objects.update(created_at=Post.objects.first().created_at)
+        self.expected = list(Post.objects.order_by('-created_at', '-id'))
+
+    def test_walks_forward_and_back_without_gaps(self):
+        paginator = KeysetPaginator(Post.objects.all(), 3, Post._meta.ordering)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), self.expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+
+        self.assertEqual(list(paginator.page(third.previous_cursor)), list(second))
+        back_to_first = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back_to_first), list(first))
+        self.assertFalse(back_to_first.has_previous())
+
+    def test_rejects_garbage_cursor(self):
+        paginator = KeysetPaginator(Post.objects.all(), 3, Post._meta.ordering)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+
+    @override_settings(BLOG_PAGINATION='cursor')
+    def test_list_view_uses_cursor_mode(self):
+        view = PostListView()
+        view.setup(RequestFactory().get('/'))
+        view.object_list = view.get_queryset()
+        context = view.get_context_data()
+        self.assertTrue(context['cursor_pagination'])
+        self.assertEqual(list(context['posts']), self.expected[:5])
+
+        view.setup(RequestFactory().get('/', {'cursor': context['page_obj'].next_cursor}))
+        context = view.get_context_data()
+        self.assertEqual(list(context['posts']), self.expected[5:])
+
+        view.setup(RequestFactory().get('/', {'cursor': 'bogus'}))
+        with self.assertRaises(Http404):
+            view.get_context_data()
+
+    def test_search_results_page_by_rank(self):
+        for i in range(4):
+            Post.objects.create(title='Cursor ' * (i + 1), content='Body', author=self.user)
+        results = search_posts(Post.objects.all(), 'cursor')
+        paginator = KeysetPaginator(results, 3, results.query.order_by)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(first) + list(second), list(results))
+        self.assertFalse(second.has_next())
+
+
+@override_settings(BLOG_PAGE_CACHE_SECONDS=0)  # measures the rendering underneath the page cache
+class QueryCountTests(TestCase):
+    """Rendering a page costs the same number of queries however much it shows."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+        view_counter.discard()  # so no buffered views get flushed inside a counted request
+
+    def add_posts(self, count, tags=3, comments=3):
+        posts = []
+        for i in range(count):
+            author = User.objects.create(username=f'writer{Post.objects.count()}')
+            post = Post.objects.create(title=f'Post {i}', content='Body', author=author)
+            post.tags.add(*[f'tag{i}-{t}' for t in range(tags)])
+            Comment.objects.bulk_create([
+                Comment(post=post, author=self.user, content='Nice') for _ in range(comments)
+            ])
+            posts.append(post)
+        counters.rebuild()
+        return posts
+
+    def test_post_list_query_count_is_constant(self):
+        self.add_posts(1, tags=1, comments=0)
+        # paginator COUNT, the page of posts with authors, the page's tags
+        with self.assertNumQueries(3):
+            self.client.get(reverse('blog:post_list'))
+
+        self.add_posts(4, tags=5, comments=5)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blog:post_list'))
+        self.assertEqual(len(response.context['posts']), 5)
+
+    def test_tag_list_query_count_is_constant(self):
+        for post in self.add_posts(5):
+            post.tags.add('shared')
+        url = reverse('blog:post_list_by_tag', kwargs={'tag_slug': 'shared'})
+        # tag lookup, paginator COUNT, page ids, posts with authors, their tags
+        with self.assertNumQueries(5):
+            self.client.get(url)
+        # the ids now come from the result cache
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+    def test_post_detail_query_count_is_constant(self):
+        quiet, busy = self.add_posts(1, tags=0, comments=0) + self.add_posts(1, tags=8, comments=20)
+        # ETag validators, post with author, its tags, its comments with their authors,
+        # its related posts
+        with self.assertNumQueries(5):
+            self.client.get(reverse('blog:post_detail', kwargs={'pk': quiet.pk}))
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('blog:post_detail', kwargs={'pk': busy.pk}))
+        self.assertContains(response, 'Comments (20)')
+
+
+@override_settings(BLOG_PAGE_CACHE_SECONDS=0)  # measures the rendering underneath the page cache
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Cached title', content='Body', author=self.user)
+        self.post.tags.add('caching')
+        self.url = reverse('blog:post_list')
+
+    def test_second_render_is_served_from_cache(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(fragment_cache.stats()['misses'], 1)
+        self.assertEqual(fragment_cache.stats()['hits'], 1)
+
+    def test_stats_command_sees_the_servers_counters(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        output = run_elsewhere(
+            "from django.core.management import call_command; call_command('fragment_cache_stats')"
+        )
+        self.assertIn('hits: 1  misses: 1', output)
+
+    def test_edits_and_tag_changes_invalidate(self):
+        self.client.get(self.url)
+        self.post.title = 'Fresh title'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), 'Fresh title')
+
+        self.post.tags.add('invalidation')
+        self.assertContains(self.client.get(self.url), 'invalidation')
+        self.assertEqual(fragment_cache.stats()['hits'], 0)
+
+    def test_author_links_stay_outside_the_fragment(self):
+        self.client.get(self.url)
+        self.client.login(username='author', password='testpass')
+        response = self.client.get(self.url)
+        self.assertContains(response, reverse('blog:post_edit', kwargs={'pk': self.post.pk}))
+        self.assertEqual(fragment_cache.stats()['hits'], 1)
+
+    def test_detail_body_is_cached(self):
+        url = reverse('blog:post_detail', kwargs={'pk': self.post.pk})
+        self.client.get(url)
+        self.assertContains(self.client.get(url), 'Cached title')
+        self.assertEqual(fragment_cache.stats()['hits'], 1)
+
+
+class CommentCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Counted', content='Body', author=self.user)
+        self.client.login(username='author', password='testpass')
+
+    def comment(self, content='Hello'):
+        self.client.post(reverse('blog:comment_create', kwargs={'pk': self.post.pk}), {'content': content})
+        return Comment.objects.latest('id')
+
+    def test_views_keep_counters_in_step(self):
+        first = self.comment('first')
+        second = self.comment('second')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.last_comment_at, second.created_at)
+
+        self.client.post(reverse('blog:comment_delete', kwargs={'pk': second.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_comment_at, first.created_at)
+
+        self.client.post(reverse('blog:comment_delete', kwargs={'pk': first.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.post.last_comment_at), (0, None))
+        self.assertFalse(counters.drifted_posts().exists())
+
+    def test_check_detects_drift_and_rebuild_repairs_it(self):
+        Comment.objects.create(post=self.post, author=self.user, content='Behind the view')
+        self.assertEqual(list(counters.drifted_posts()), [self.post])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_comment_counters', '--check', stdout=StringIO())
+
+        call_command('rebuild_comment_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        call_command('rebuild_comment_counters', '--check', stdout=StringIO())
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Busy thread', content='Body', author=self.user)
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, content=f'comment-{i:02d}') for i in range(7)
+        ])
+        counters.rebuild()
+
+    def test_detail_renders_first_page_and_endpoint_serves_the_rest(self):
+        with patch.object(PostDetailView, 'comments_paginate_by', 3):
+            response = self.client.get(reverse('blog:post_detail', kwargs={'pk': self.post.pk}))
+        self.assertContains(response, 'comment-02')
+        self.assertNotContains(response, 'comment-03')
+        self.assertContains(response, 'Comments (7)')
+
+        seen = []
+        cursor = response.context['comments'].next_cursor
+        url = reverse('blog:comment_page', kwargs={'pk': self.post.pk})
+        with patch('blog.views.CommentPageView.paginate_by', 3):
+            while cursor:
+                page = self.client.get(url, {'cursor': cursor}).json()
+                seen.extend(re.findall(r'comment-\d+', page['html']))
+                cursor = page['next_cursor']
+        self.assertEqual(seen, [f'comment-{i:02d}' for i in range(3, 7)])
+
+    def test_endpoint_rejects_bad_cursor(self):
+        url = reverse('blog:comment_page', kwargs={'pk': self.post.pk})
+        self.assertEqual(self.client.get(url, {'cursor': 'nope'}).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Validated', content='Body', author=self.user)
+        self.detail_url = reverse('blog:post_detail', kwargs={'pk': self.post.pk})
+
+    def test_detail_answers_304_from_one_row_lookup(self):
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_follows_comment_edits(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, content='First')
+        counters.comment_added(comment)
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.client.login(username='author', password='testpass')
+        self.client.post(reverse('blog:comment_edit', kwargs={'pk': comment.pk}), {'content': 'Edited'})
+        self.client.logout()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Edited')
+
+    def test_detail_validators_follow_the_related_posts(self):
+        self.post.tags.add('shared')
+        old = Post.objects.create(title='Related B', content='Body', author=self.user)
+        old.tags.add('shared')
+        response = self.client.get(self.detail_url)
+        etag, last_modified = response['ETag'], self.detail_last_modified()
+        self.assertContains(response, 'Related B')
+
+        old.delete()
+        Post.objects.create(title='Related C', content='Body', author=self.user).tags.add('shared')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Related B')
+        self.assertContains(response, 'Related C')
+        self.assertGreater(self.detail_last_modified(), last_modified)
+
+    def detail_last_modified(self):
+        request = RequestFactory().get(self.detail_url)
+        request.user = AnonymousUser()
+        return conditional.post_detail_last_modified(request, self.post.pk)
+
+    def test_flash_messages_are_not_swallowed_by_a_304(self):
+        other = User.objects.create_user(username='other', password='testpass')
+        self.client.force_login(other)
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.get(reverse('blog:post_edit', args=[self.post.pk]))
+        self.assertRedirects(response, self.detail_url, fetch_redirect_response=False)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'You are not authorized to edit this post.')
+        # Once shown, the page validates again.
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_etag_differs_per_viewer(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.login(username='author', password='testpass')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_list_revalidates_until_content_changes(self):
+        url = reverse('blog:post_list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Post.objects.create(title='Newer', content='Body', author=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_follows_writes_made_by_other_processes(self):
+        url = reverse('blog:post_list')
+        etag = self.client.get(url)['ETag']
+        run_elsewhere('from blog import content_version; content_version.bump()')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(BLOG_PAGE_CACHE_SECONDS=0)  # measures the rendering underneath the page cache
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_results.clear()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Cache me', content='Body', author=self.user)
+
+    def test_search_pages_are_reused_until_content_changes(self):
+        url = reverse('blog:post_list')
+        self.client.get(url, {'q': 'cache me'})
+        response = self.client.get(url, {'q': 'ME  Cache'})
+        self.assertEqual(list(response.context['posts']), [self.post])
+        self.assertEqual((search_results.misses, search_results.hits), (1, 1))
+
+        newer = Post.objects.create(title='Cache me too', content='Body', author=self.user)
+        response = self.client.get(url, {'q': 'cache me'})
+        self.assertEqual(list(response.context['posts']), [newer, self.post])
+        self.assertEqual(search_results.misses, 2)
+
+    @override_settings(BLOG_PAGINATION='cursor')
+    def test_cursor_pages_are_cached_with_their_cursors(self):
+        for i in range(6):
+            Post.objects.create(title=f'Cache entry {i}', content='Body', author=self.user)
+        url = reverse('blog:post_list')
+        first = self.client.get(url, {'q': 'cache'}).context['page_obj']
+        again = self.client.get(url, {'q': 'cache'}).context['page_obj']
+        self.assertEqual(again.next_cursor, first.next_cursor)
+        second = self.client.get(url, {'q': 'cache', 'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(len(first) + len(second), 7)
+        self.assertEqual(search_results.hits, 1)
+
+    def test_lru_eviction_bounds_the_size(self):
+        results = ResultCache(max_entries=2)
+        for key in 'abc':
+            results.get_or_compute(key, lambda: key)
+        results.get_or_compute('b', lambda: 'recomputed')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results.get_or_compute('a', lambda: 'fresh'), 'fresh')
+
+    def test_entries_expire_after_the_ttl(self):
+        results = ResultCache(max_entries=10, ttl=60)
+        results.get_or_compute('k', lambda: 'old')
+        with patch('blog.result_cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(results.get_or_compute('k', lambda: 'new'), 'new')
+        self.assertEqual(results.get_or_compute('k', lambda: 'newer'), 'new')
+
+    def test_concurrent_misses_compute_once(self):
+        results = ResultCache(max_entries=10)
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'value'
+
+        threads = [threading.Thread(target=results.get_or_compute, args=('k', slow)) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+
+class TagAutocompleteTests(TestCase):
+    def setUp(self):
+        tag_index.reset()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.url = reverse('blog:tag_autocomplete')
+
+    def tag_posts(self, *tag_sets):
+        posts = []
+        for tags in tag_sets:
+            post = Post.objects.create(title='Tagged', content='Body', author=self.user)
+            post.tags.add(*tags)
+            posts.append(post)
+        return posts
+
+    def names(self, prefix):
+        return [r['name'] for r in self.client.get(self.url, {'q': prefix}).json()['results']]
+
+    def test_suggestions_ranked_by_usage_without_queries(self):
+        self.tag_posts(['django', 'python'], ['django', 'djangocon'], ['django', 'Python'])
+        self.names('dj')  # warms the index
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('dj'), ['django', 'djangocon'])
+        self.assertEqual(self.names('PY'), ['Python', 'python'])
+        self.assertEqual(self.names('x'), [])
+
+    def test_index_follows_tag_changes(self):
+        first, second = self.tag_posts(['rust'], ['ruby'])
+        self.assertEqual(self.names('ru'), ['ruby', 'rust'])
+
+        second.tags.add('rust')
+        self.assertEqual(self.names('ru'), ['rust', 'ruby'])
+
+        first.delete()
+        second.tags.remove('ruby')
+        self.assertEqual(self.client.get(self.url, {'q': 'ru'}).json()['results'],
+                         [{'name': 'rust', 'slug': 'rust', 'count': 1}])
+
+
+class ImportCommandTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass')
+        User.objects.create_user(username='bob', password='testpass')
+        tmpdir = TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+        Post.objects.create(title='Existing', content='Tagged already', author=self.alice).tags.add('django')
+
+    def import_file(self, name, text, *args):
+        path = f'{self.tmpdir}/{name}'
+        with open(path, 'w') as f:
+            f.write(text)
+        out = StringIO()
+        call_command('import_blog', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_jsonl_import_creates_posts_tags_comments_and_index(self):
+        records = [
+            {'title': 'Imported ORM tips', 'content': 'Use bulk_create', 'author': 'alice',
+             'created_at': '2020-01-02T03:04:05Z', 'tags': ['Django', 'django', 'New Tag'],
+             'comments': [{'author': 'bob', 'content': 'Nice', 'created_at': '2020-01-03T00:00:00Z'}]},
+            {'title': 'Second', 'content': 'Plain', 'author': 'bob'},
+        ]
+        output = self.import_file('posts.jsonl', '\n'.join(json.dumps(r) for r in records), '--batch-size', '1')
+        self.assertIn('Imported 2 posts, 1 comments', output)
+
+        post = Post.objects.get(title='Imported ORM tips')
+        self.assertEqual(post.created_at.year, 2020)
+        self.assertEqual(sorted(post.tags.names()), ['Django', 'New Tag', 'django'])
+        self.assertEqual(post.tags.get(name='Django').slug, 'django_1')
+        self.assertEqual((post.comment_count, post.last_comment_at.day), (1, 3))
+        self.assertEqual(list(search_posts(Post.objects.all(), 'bulk_create')), [post])
+
+        comment_line = json.dumps({'post_id': post.pk, 'author': 'alice', 'content': 'Thanks'})
+        self.import_file('comments.jsonl', comment_line)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+
+    def test_csv_import_and_errors_name_the_line(self):
+        self.import_file('posts.csv', 'title,content,author,tags\nFrom CSV,Body,alice,"django, csv"\n')
+        self.assertEqual(sorted(Post.objects.get(title='From CSV').tags.names()), ['csv', 'django'])
+        self.assertEqual(Tag.objects.filter(name='django').count(), 1)
+
+        with self.assertRaisesMessage(CommandError, 'line 3: missing content'):
+            self.import_file('bad.csv', 'title,content,author\nOk,Body,alice\nBroken,,alice\n')
+        with self.assertRaisesMessage(CommandError, 'unknown author(s): carol'):
+            self.import_file('bad.jsonl', json.dumps({'title': 'T', 'content': 'C', 'author': 'carol'}))
+        self.assertFalse(Post.objects.filter(title__in=['Ok', 'T']).exists())
+
+    def test_the_running_server_sees_the_import(self):
+        before = run_elsewhere('from blog import content_version; print(content_version.current())')
+        self.import_file('posts.jsonl', json.dumps({'title': 'Late', 'content': 'Body', 'author': 'alice'}))
+        after = run_elsewhere('from blog import content_version; print(content_version.current())')
+        self.assertNotEqual(after, before)
+        self.assertEqual(after, content_version.current())
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass')
+        self.bob = User.objects.create_user(username='bob', password='testpass')
+        self.staff = User.objects.create_user(username='staff', password='testpass', is_staff=True)
+        self.old = Post.objects.create(title='Old', content='First', author=self.alice)
+        Post.objects.filter(pk=self.old.pk).update(created_at='2020-01-01T00:00:00Z')
+        self.new = Post.objects.create(title='New', content='Second', author=self.bob)
+        self.new.tags.add('django', 'async')
+        Comment.objects.create(post=self.new, author=self.alice, content='Nice')
+        self.url = reverse('blog:export')
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_nests_tags_and_comments(self):
+        records = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([r['title'] for r in records], ['New', 'Old'])
+        self.assertEqual(records[0]['tags'], ['async', 'django'])
+        self.assertEqual([(c['author'], c['content']) for c in records[0]['comments']], [('alice', 'Nice')])
+        self.assertEqual(records[1]['author'], 'alice')
+
+    def test_filters_and_csv(self):
+        self.assertEqual(self.export(author='alice').count('\n'), 1)
+        self.assertEqual(self.export(tag='django', since='2021-01-01').count('\n'), 1)
+        self.assertEqual(self.export(until='2021-01-01').count('"New"'), 0)
+
+        rows = list(csv.DictReader(StringIO(self.export(format='csv'))))
+        self.assertEqual([(r['title'], r['tags']) for r in rows], [('New', 'async, django'), ('Old', '')])
+        rows = list(csv.DictReader(StringIO(self.export(format='csv', model='comments'))))
+        self.assertEqual([(r['post_id'], r['author']) for r in rows], [(str(self.new.pk), 'alice')])
+
+        self.assertEqual(self.client.get(self.url, {'since': 'yesterday'}).status_code, 400)
+
+    def test_reads_posts_in_chunks(self):
+        with self.assertNumQueries(1 + 2 * 2):  # one streamed posts query, then tags + comments per chunk
+            out = StringIO()
+            call_command('export_blog', '--chunk-size', '1', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_requires_staff(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.posts = [
+            Post.objects.create(title=f'Async post {i}', content='Body', author=self.user) for i in range(7)
+        ]
+        self.posts[0].tags.add('asgi')
+        Comment.objects.create(post=self.posts[0], author=self.user, content='First!')
+
+    async def get(self, view, path, headers=None, **kwargs):
+        request = AsyncRequestFactory().get(path, headers=headers)
+        request.user = AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        return await view.as_view()(request, **kwargs)
+
+    async def test_list_matches_the_sync_view(self):
+        response = await self.get(AsyncPostListView, '/?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Async post 1')
+        self.assertNotContains(response, 'Async post 2<')
+        self.assertTrue(response.has_header('ETag'))
+
+        sync = await self.async_client.get(reverse('blog:post_list'), {'page': 2})
+        titles = re.compile(r'Async post \d')
+        self.assertEqual(titles.findall(response.content.decode()), titles.findall(sync.content.decode()))
+
+        with override_settings(BLOG_PAGINATION='cursor'):
+            response = await self.get(AsyncPostListView, '/')
+        self.assertContains(response, 'cursor=')
+
+    async def test_tag_listing_and_search(self):
+        response = await self.get(AsyncPostByTagListView, '/tags/asgi/', tag_slug='asgi')
+        self.assertContains(response, 'Async post 0')
+        self.assertNotContains(response, 'Async post 1')
+        with self.assertRaises(Http404):
+            await self.get(AsyncPostByTagListView, '/tags/nope/', tag_slug='nope')
+        response = await self.get(AsyncPostListView, '/?q=asgi')
+        self.assertContains(response, 'Async post 0')
+
+    async def test_detail_and_conditional_get(self):
+        post = self.posts[0]
+        response = await self.get(AsyncPostDetailView, f'/post/{post.pk}/', pk=post.pk)
+        self.assertContains(response, 'First!')
+
+        response = await self.get(AsyncPostDetailView, f'/post/{post.pk}/',
+                                  headers={'if-none-match': response['ETag']}, pk=post.pk)
+        self.assertEqual(response.status_code, 304)
+        with self.assertRaises(Http404):
+            await self.get(AsyncPostDetailView, '/post/0/', pk=0)
+
+
+@override_settings(BLOG_DB_REPLICAS={'replica1': 3, 'replica2': 1}, BLOG_REPLICA_RETRY_SECONDS=30)
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_are_spread_by_weight_and_writes_go_to_default(self):
+        random.seed(1)
+        with patch.object(ReplicaRouter, '_available', return_value=True), \
+                patch.object(connection, 'in_atomic_block', False):
+            picks = [self.router.db_for_read(Post) for _ in range(4000)]
+            self.assertIsNone(self.router.db_for_read(User))
+            with use_primary():
+                self.assertIsNone(self.router.db_for_read(Post))
+        self.assertAlmostEqual(picks.count('replica1') / picks.count('replica2'), 3, delta=0.4)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        # TestCase wraps each test in a transaction, which keeps reads on the primary.
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_unreachable_replicas_are_skipped_then_retried(self):
+        broken = Mock(**{'ensure_connection.side_effect': OperationalError('unable to open database file')})
+        with patch('blog.routers.connections', {'replica1': broken, 'replica2': Mock()}):
+            self.assertEqual({self.router.choose_replica() for _ in range(20)}, {'replica2'})
+            self.assertEqual(broken.ensure_connection.call_count, 1)
+
+            self.assertFalse(self.router._available('replica1'))
+            self.assertEqual(broken.ensure_connection.call_count, 1)
+            with patch('blog.routers.time.monotonic', return_value=time.monotonic() + 31):
+                self.assertFalse(self.router._available('replica1'))
+            self.assertEqual(broken.ensure_connection.call_count, 2)
+
+        down = Mock(**{'ensure_connection.side_effect': OperationalError})
+        with patch('blog.routers.connections', {'replica1': down, 'replica2': down}):
+            self.assertEqual(ReplicaRouter().choose_replica(), 'default')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        seen = []
+        middleware = PrimaryPinningMiddleware(lambda request: seen.append(_pinned.get()) or HttpResponse())
+        factory = RequestFactory()
+
+        response = middleware(factory.post('/post/1/comments/new/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        middleware(factory.get('/post/1/', headers={'cookie': f'{PIN_COOKIE}=1'}))
+        middleware(factory.get('/post/1/'))
+        self.assertEqual(seen, [True, True, False])
+
+        with override_settings(BLOG_DB_REPLICAS={}):
+            self.assertNotIn(PIN_COOKIE, middleware(factory.post('/')).cookies)
+
+
+class OwnershipTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass')
+        self.other = User.objects.create_user(username='other', password='testpass')
+        self.post = Post.objects.create(title='Mine', content='Body', author=self.owner)
+        self.comment = Comment.objects.create(post=self.post, author=self.owner, content='Hello')
+        counters.rebuild()
+
+    def test_owner_requests_fetch_the_object_once(self):
+        self.client.force_login(self.owner)
+        # session + user, then one owner-filtered fetch of the comment (with its post)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(reverse('blog:comment_edit', args=[self.comment.pk])).status_code, 200)
+        # session + user, then the post, and its tags for the form
+        ContentType.objects.get_for_model(Post)  # cached for the life of a real process
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.get(reverse('blog:post_edit', args=[self.post.pk])).status_code, 200)
+
+        response = self.client.post(reverse('blog:comment_delete', args=[self.comment.pk]))
+        self.assertRedirects(response, reverse('blog:post_detail', args=[self.post.pk]), fetch_redirect_response=False)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_other_users_are_redirected_and_missing_objects_404(self):
+        self.client.force_login(self.other)
+        for name, obj in (('post_edit', self.post), ('post_delete', self.post), ('comment_edit', self.comment)):
+            response = self.client.post(reverse(f'blog:{name}', args=[obj.pk]), {'content': 'Hijacked'})
+            self.assertRedirects(response, reverse('blog:post_detail', args=[self.post.pk]),
+                                 fetch_redirect_response=False)
+        self.assertEqual(Comment.objects.get().content, 'Hello')
+        self.assertTrue(Post.objects.exists())
+        self.assertEqual(self.client.get(reverse('blog:comment_delete', args=[0])).status_code, 404)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='testpass')
+        self.post = Post.objects.create(title='Feeds are cheap', content='Body', author=self.user)
+        self.post.tags.add('django')
+
+    def test_feed_is_stored_once_and_served_with_validators(self):
+        url = reverse('blog:feed', args=['rss'])
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        self.assertContains(response, 'Feeds are cheap')
+        self.assertEqual(FeedDocument.objects.count(), 1)
+
+        with self.assertNumQueries(1):
+            again = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+        zipped = self.client.get(url, headers={'accept-encoding': 'gzip, deflate'})
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertNotEqual(zipped['ETag'], response['ETag'])
+        self.assertEqual(gzip.decompress(zipped.content), response.content)
+
+    def test_post_changes_regenerate_only_affected_feeds(self):
+        other = User.objects.create_user(username='other', password='testpass')
+        Post.objects.create(title='Unrelated', content='Body', author=other).tags.add('python')
+        urls = {
+            'site': reverse('blog:feed', args=['atom']),
+            'tag': reverse('blog:tag_feed', args=['rss', 'django']),
+            'author': reverse('blog:author_feed', args=['rss', 'writer']),
+            'other': reverse('blog:author_feed', args=['rss', 'other']),
+            'python': reverse('blog:tag_feed', args=['rss', 'python']),
+        }
+        for url in urls.values():
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(FeedDocument.objects.count(), 5)
+
+        self.post.title = 'Renamed post'
+        self.post.save()
+        self.assertEqual(set(FeedDocument.objects.values_list('scope', flat=True)),
+                         {'author:other', 'tag:python'})
+        self.assertContains(self.client.get(urls['tag']), 'Renamed post')
+
+        self.post.tags.remove('django')
+        self.assertNotContains(self.client.get(urls['tag']), 'Renamed post')
+        self.assertEqual(self.client.get(reverse('blog:tag_feed', args=['rss', 'nope'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('blog:feed', args=['json'])).status_code, 404)
+
+    def test_last_modified_never_goes_back(self):
+        url = reverse('blog:feed', args=['rss'])
+        self.client.get(url)
+        before = FeedDocument.objects.get().last_modified
+        Post.objects.create(title='Newest', content='Body', author=self.user)
+        self.client.get(url)
+        Post.objects.get(title='Newest').delete()
+        self.client.get(url)
+        self.assertGreater(FeedDocument.objects.get().last_modified, before)
+
+    def test_imports_drop_the_feeds_they_change(self):
+        other = User.objects.create_user(username='other', password='testpass')
+        Post.objects.create(title='Unrelated', content='Body', author=other)
+        urls = [
+            reverse('blog:feed', args=['rss']),
+            reverse('blog:tag_feed', args=['rss', 'django']),
+            reverse('blog:author_feed', args=['rss', 'writer']),
+            reverse('blog:author_feed', args=['rss', 'other']),
+        ]
+        for url in urls:
+            self.client.get(url)
+        BlogImporter().run([(1, {'title': 'Imported', 'content': 'Body', 'author': 'writer', 'tags': ['django']})])
+        self.assertEqual(list(FeedDocument.objects.values_list('scope', flat=True)), ['author:other'])
+        for url in urls[:3]:
+            self.assertContains(self.client.get(url), 'Imported')
+
+
+class RelatedPostsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+
+    def make_post(self, title, *tags):
+        post = Post.objects.create(title=title, content='Body', author=self.user)
+        if tags:
+            post.tags.add(*tags)
+        return post
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by('rank').values_list('related__title', flat=True))
+
+    def assert_matches_rebuild(self):
+        incremental = set(RelatedPost.objects.values_list('post_id', 'related_id', 'rank'))
+        related.rebuild()
+        self.assertEqual(incremental, set(RelatedPost.objects.values_list('post_id', 'related_id', 'rank')))
+
+    def test_ranked_by_jaccard_and_shown_on_detail(self):
+        base = self.make_post('Base', 'django', 'orm', 'sql')
+        self.make_post('Close', 'django', 'orm')        # 2/3
+        self.make_post('Far', 'django', 'css', 'html')  # 1/5
+        self.make_post('None', 'rust')
+        self.assertEqual(self.related(base), ['Close', 'Far'])
+        self.assertContains(self.client.get(reverse('blog:post_detail', args=[base.pk])), 'Related Posts')
+
+    @override_settings(BLOG_RELATED_POSTS=2)
+    def test_incremental_updates_match_a_full_rebuild(self):
+        posts = [self.make_post(f'P{i}', *tags) for i, tags in enumerate(
+            [('a', 'b'), ('a',), ('b', 'c'), ('c',), ('a', 'b', 'c'), ('d',)]
+        )]
+        self.assert_matches_rebuild()
+        posts[3].tags.add('a', 'b')
+        posts[0].tags.remove('a')
+        posts[5].tags.add('c')
+        self.assert_matches_rebuild()
+        posts[4].delete()
+        self.assert_matches_rebuild()
+        self.assertNotIn('P4', self.related(posts[2]))
+
+    def test_rebuild_command_with_workers(self):
+        for i in range(30):
+            self.make_post(f'P{i}', f't{i % 3}', f'u{i % 5}')
+        expected = set(RelatedPost.objects.values_list('post_id', 'related_id', 'rank'))
+        RelatedPost.objects.all().delete()
+        call_command('rebuild_related_posts', '--processes', '2', '--chunk-size', '7', stdout=StringIO())
+        self.assertEqual(set(RelatedPost.objects.values_list('post_id', 'related_id', 'rank')), expected)
+
+    def test_rebuild_retires_the_detail_pages_of_every_process(self):
+        base = self.make_post('Base', 'django')
+        self.make_post('Other', 'django')
+        etag = self.client.get(reverse('blog:post_detail', args=[base.pk]))['ETag']
+        call_command('rebuild_related_posts', stdout=StringIO())
+        self.assertEqual(run_elsewhere('from blog import content_version; print(content_version.current())'),
+                         content_version.current())
+        response = self.client.get(reverse('blog:post_detail', args=[base.pk]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass')
+        self.bob = User.objects.create_user(username='bob', password='testpass')
+
+    def make_post(self, title, author, year, month):
+        post = Post.objects.create(title=title, content='Body', author=author)
+        Post.objects.filter(pk=post.pk).update(created_at=datetime(year, month, 15, tzinfo=dt_timezone.utc))
+        post.refresh_from_db()
+        # created_at is auto_now_add, so move the bucket as an edit would
+        archive.add(author.pk, *archive.bucket_for(post.created_at), 1)
+        archive.add(author.pk, *archive.bucket_for(post.updated_at), -1)
+        return post
+
+    def buckets(self):
+        return set(ArchiveBucket.objects.filter(post_count__gt=0).values_list('author__username', 'year', 'month', 'post_count'))
+
+    def test_counts_follow_saves_and_deletes(self):
+        march = self.make_post('March', self.alice, 2024, 3)
+        self.make_post('March too', self.alice, 2024, 3)
+        self.make_post('April', self.bob, 2024, 4)
+        self.assertEqual(self.buckets(), {('alice', 2024, 3, 2), ('bob', 2024, 4, 1)})
+
+        march.author = self.bob
+        march.save()
+        self.assertEqual(self.buckets(), {('alice', 2024, 3, 1), ('bob', 2024, 3, 1), ('bob', 2024, 4, 1)})
+        march.delete()
+        self.assertEqual(self.buckets(), {('alice', 2024, 3, 1), ('bob', 2024, 4, 1)})
+
+        expected = self.buckets()
+        call_command('rebuild_archive_counts', stdout=StringIO())
+        self.assertEqual(self.buckets(), expected)
+
+    def test_month_counts_are_cached(self):
+        self.make_post('March', self.alice, 2024, 3)
+        self.make_post('April', self.alice, 2024, 4)
+        self.make_post('April too', self.bob, 2024, 4)
+        self.assertEqual(archive.month_counts(), [(date(2024, 4, 1), 2), (date(2024, 3, 1), 1)])
+        with self.assertNumQueries(0):
+            self.assertEqual(archive.month_counts(), [(date(2024, 4, 1), 2), (date(2024, 3, 1), 1)])
+        self.assertEqual(archive.month_counts(self.bob.pk), [(date(2024, 4, 1), 1)])
+
+    def test_archive_pages(self):
+        self.make_post('Alice in March', self.alice, 2024, 3)
+        self.make_post('Alice in April', self.alice, 2024, 4)
+        self.make_post('Bob in April', self.bob, 2024, 4)
+
+        response = self.client.get(reverse('blog:archive_month', args=[2024, 4]))
+        self.assertEqual([p.title for p in response.context['posts']], ['Bob in April', 'Alice in April'])
+        self.assertEqual(response.context['archive_months'], [(date(2024, 4, 1), 2), (date(2024, 3, 1), 1)])
+        self.assertContains(response, '<a href="/archive/2024/3/">March 2024</a>', html=True)
+
+        response = self.client.get(reverse('blog:author_archive', args=['alice']))
+        self.assertEqual([p.title for p in response.context['posts']], ['Alice in April', 'Alice in March'])
+        response = self.client.get(reverse('blog:author_archive_month', args=['alice', 2024, 3]))
+        self.assertEqual([p.title for p in response.context['posts']], ['Alice in March'])
+
+        self.assertEqual(self.client.get(reverse('blog:author_archive', args=['nobody'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('blog:archive_month', args=[2024, 13])).status_code, 404)
+
+
+@override_settings(BLOG_VIEW_FLUSH_THRESHOLD=3, BLOG_VIEW_FLUSH_INTERVAL=3600)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        view_counter.discard()
+        view_counter_module.reset_stats()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Read me', content='Body', author=self.user)
+        self.other = Post.objects.create(title='Read me too', content='Body', author=self.user)
+
+    def test_views_are_buffered_then_flushed_in_one_batch(self):
+        with self.assertNumQueries(0):
+            view_counter.record(self.post.pk)
+            view_counter.record(self.other.pk)
+        self.assertEqual(len(view_counter), 2)
+        view_counter.record(self.post.pk)  # reaches the threshold
+        self.assertEqual(len(view_counter), 0)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 2)
+        self.assertEqual(PostViewWindow.objects.get(post=self.post).views, 2)
+        self.assertEqual(PostViewDay.objects.get(post=self.other).views, 1)
+        stats = view_counter_module.stats()
+        self.assertEqual((stats['flushes'], stats['flushed_views'], stats['flushed_posts']), (1, 3, 2))
+
+    def test_stats_command_sees_the_servers_flushes(self):
+        view_counter.record(self.post.pk)
+        view_counter.flush()
+        output = run_elsewhere(
+            "from django.core.management import call_command; call_command('view_counter_stats')"
+        )
+        self.assertIn('flushes: 1  failed: 0  failed expiries: 0  views: 1', output)
+
+    def test_failed_flush_keeps_the_views(self):
+        view_counter.record(self.post.pk)
+        with patch('blog.view_counter.write_views', side_effect=DatabaseError):
+            self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(len(view_counter), 1)
+        self.assertEqual(view_counter_module.stats()['failed_flushes'], 1)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).view_count, 1)
+
+    def test_failed_expiry_does_not_write_the_views_twice(self):
+        view_counter.record(self.post.pk)
+        with patch('blog.view_counter.expire', side_effect=OperationalError('database is locked')):
+            self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(len(view_counter), 0)
+        self.assertEqual(view_counter_module.stats()['failed_expiries'], 1)
+        view_counter.flush()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).view_count, 1)
+
+    def test_background_flusher_keeps_writes_off_the_request(self):
+        counter = view_counter_module.ViewCounter()
+        flushed = threading.Event()
+        with patch.object(counter, 'flush', side_effect=flushed.set), patch('atexit.register'):
+            counter.start_flusher()
+            with self.assertNumQueries(0):
+                for _ in range(3):  # the third reaches the threshold
+                    counter.record(self.post.pk)
+            self.assertTrue(flushed.wait(5))
+        self.assertEqual(len(counter), 3)
+
+    def test_detail_views_feed_the_leaderboard(self):
+        url = reverse('blog:post_detail', args=[self.other.pk])
+        for _ in range(2):
+            self.client.get(url)
+        self.client.get(reverse('blog:post_detail', args=[self.post.pk]))
+        response = self.client.get(reverse('blog:popular_posts'))
+        self.assertEqual([(p.title, p.recent_views) for p in response.context['posts']],
+                         [('Read me too', 2), ('Read me', 1)])
+
+    def test_days_leaving_the_window_are_subtracted(self):
+        today = timezone.localdate()
+        write_views({self.post.pk: 5, self.other.pk: 1}, today - timedelta(days=7))
+        write_views({self.post.pk: 1}, today)
+        view_counter_module.expire(today)
+        self.assertEqual(dict(PostViewWindow.objects.values_list('post_id', 'views')), {self.post.pk: 1})
+        self.assertEqual(list(PostViewDay.objects.values_list('day', flat=True)), [today])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).view_count, 6)
+
+
+class ExcerptTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass')
+
+    def test_excerpt_follows_content_and_list_skips_content(self):
+        post = Post.objects.create(title='Long', content='word ' * 100, author=self.user)
+        self.assertEqual(post.excerpt, Truncator('word ' * 100).chars(200))
+        post.content = 'Short now'
+        post.save(update_fields=['content'])
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'Short now')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog:post_list'))
+        self.assertContains(response, 'Short now')
+        post_query = next(q['sql'] for q in queries if 'FROM "blog_post"' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertNotIn('"blog_post"."content"', post_query)
+
+    def test_backfill_command(self):
+        post = Post.objects.create(title='Stale', content='Fresh body', author=self.user)
+        Post.objects.filter(pk=post.pk).update(excerpt='')
+        out = StringIO()
+        call_command('backfill_excerpts', '--missing', stdout=out)
+        self.assertIn('updated 1 excerpts', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'Fresh body')
+
+
+@override_settings(BLOG_PAGE_CACHE_SECONDS=60)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_counter.discard()
+        self.user = User.objects.create_user(username='author', password='testpass')
+        self.post = Post.objects.create(title='Cached page', content='Body', author=self.user)
+        self.detail_url = reverse('blog:post_detail', args=[self.post.pk])
+
+    def test_anonymous_hits_need_no_queries(self):
+        self.assertEqual(self.client.get(reverse('blog:post_list'))['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('blog:post_list'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Cached page')
+        self.assertContains(response, 'Login')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_holes_are_filled_per_user(self):
+        self.client.get(self.detail_url)  # cached by an anonymous visitor
+        self.client.login(username='author', password='testpass')
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, reverse('blog:post_edit', args=[self.post.pk]))
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertContains(response, 'Logout (author)')
+        self.assertNotContains(response, '<!--blog:hole')
+
+        self.client.logout()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, reverse('blog:post_edit', args=[self.post.pk]))
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    def test_markers_in_post_content_are_left_alone(self):
+        forged = '<!--blog:hole bogus--> <!--blog:hole owner_actions post 1 x--> <!--blog:hole:0 nav-->'
+        Post.objects.create(title='Forged', content=forged, author=self.user)
+        for username in (None, 'author'):  # anonymous, then the post's author
+            if username:
+                self.client.login(username=username, password='testpass')
+            cache.clear()
+            for status in ('miss', 'hit'):
+                response = self.client.get(reverse('blog:post_list'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['X-Page-Cache'], status)
+                self.assertContains(response, forged)
+
+    @override_settings(BLOG_DB_REPLICAS={'replica1': 1}, BLOG_REPLICA_PIN_SECONDS=10)
+    def test_misses_right_after_a_write_are_rendered_from_the_primary(self):
+        pinned = []
+
+        def db_for_read(router, model, **hints):
+            pinned.append(_pinned.get())
+
+        with patch.object(ReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read):
+            self.assertEqual(self.client.get(reverse('blog:post_list'))['X-Page-Cache'], 'miss')
+            self.assertTrue(pinned)
+            self.assertTrue(all(pinned))
+
+            pinned.clear()
+            settled = content_version.changed_at() - timedelta(seconds=11)
+            with patch('blog.content_version.changed_at', return_value=settled):
+                self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'miss')
+            self.assertTrue(pinned)
+            self.assertFalse(any(pinned))
+
+    def test_writes_from_other_processes_retire_the_pages(self):
+        self.client.get(self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'hit')
+        run_elsewhere('from blog import content_version; content_version.bump()')
+        self.assertEqual(self.client.get(self.detail_url)['X-Page-Cache'], 'miss')
+
+    def test_writes_invalidate_and_hits_still_count_views(self):
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        self.assertEqual(len(view_counter), 2)
+
+        self.client.login(username='author', password='testpass')
+        self.client.post(reverse('blog:comment_create', args=[self.post.pk]), {'content': 'Fresh comment'})
+        self.client.logout()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Fresh comment')
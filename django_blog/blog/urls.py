@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include, reverse_lazy
 from . import views
 from django.contrib.auth import views as auth_views
@@ -12,19 +13,46 @@ from .views import (
     CommentCreateView, 
     CommentUpdateView,
     CommentDeleteView,
+    CommentPageView,
     # Import the required new view name
     PostByTagListView, 
+    TagAutocompleteView,
+    ExportView,
+    FeedView,
+    ArchiveMonthView,
+    AuthorArchiveView,
+    PopularPostsView,
 )
 
+
+if getattr(settings, 'BLOG_ASYNC_VIEWS', False):
+    from .async_views import (
+        AsyncPostByTagListView as PostByTagListView,
+        AsyncPostDetailView as PostDetailView,
+        AsyncPostListView as PostListView,
+    )
+
 app_name = 'blog'
 
 urlpatterns = [
     # General Blog URLs (Acts as the main list and search results page)
     path('', PostListView.as_view(), name='post_list'),
     
+    # Tag suggestions for the post form (must precede the tag slug pattern)
+    path('tags/autocomplete/', TagAutocompleteView.as_view(), name='tag_autocomplete'),
+
     # Tag URLs (Filter by tag) - MODIFIED FOR CHECKER COMPLIANCE
     path('tags/<slug:tag_slug>/', PostByTagListView.as_view(), name='post_list_by_tag'),
 
+    # Archives (post counts per month in the sidebar)
+    path('archive/<int:year>/<int:month>/', ArchiveMonthView.as_view(), name='archive_month'),
+    path('authors/<str:username>/', AuthorArchiveView.as_view(), name='author_archive'),
+    path('authors/<str:username>/<int:year>/<int:month>/', AuthorArchiveView.as_view(),
+         name='author_archive_month'),
+
+    # Most read posts of the week
+    path('popular/', PopularPostsView.as_view(), name='popular_posts'),
+
     # Post CRUD URLs
     path('post/<int:pk>/', PostDetailView.as_view(), name='post_detail'),
     path('post/new/', PostCreateView.as_view(), name='post_create'),
@@ -32,10 +60,19 @@ urlpatterns = [
     path('post/<int:pk>/delete/', PostDeleteView.as_view(), name='post_delete'),
 
     # Comment URLs
+    path('post/<int:pk>/comments/', CommentPageView.as_view(), name='comment_page'),
     path('post/<int:pk>/comments/new/', CommentCreateView.as_view(), name='comment_create'),
     path('comment/<int:pk>/update/', CommentUpdateView.as_view(), name='comment_edit'),
     path('comment/<int:pk>/delete/', CommentDeleteView.as_view(), name='comment_delete'),
 
+    # RSS/Atom feeds (<fmt> is "rss" or "atom")
+    path('feeds/<str:fmt>/', FeedView.as_view(), name='feed'),
+    path('feeds/<str:fmt>/tags/<slug:value>/', FeedView.as_view(), {'kind': 'tag'}, name='tag_feed'),
+    path('feeds/<str:fmt>/authors/<str:value>/', FeedView.as_view(), {'kind': 'author'}, name='author_feed'),
+
+    # Bulk export (staff only)
+    path('export/', ExportView.as_view(), name='export'),
+
     # Authentication URLs
     path('register/', views.register, name='register'),
     path('login/', CustomLoginView.as_view(), name='login'),
@@ -0,0 +1,255 @@
+"""
+Buffered post view counting and the "most read" leaderboard.
+
+``PostDetailView`` is wrapped in ``counts_views``, which calls
+``view_counter.record(pk)`` for every page served, from the page cache or
+not; that only bumps an in-process ``Counter``. The buffer is written out
+once it holds ``BLOG_VIEW_FLUSH_THRESHOLD`` views or every
+``BLOG_VIEW_FLUSH_INTERVAL`` seconds, as one transaction of grouped UPDATEs
+(one per distinct increment, not one per view). In the served site
+(``django_blog/wsgi.py`` and ``asgi.py`` call ``start_flusher()``) that is
+done by a background thread, so no request runs the write or fails with
+it; elsewhere (tests, management commands) the request that makes the
+buffer due flushes it inline. The flush updates:
+
+* ``Post.view_count`` holds the all-time total;
+* ``PostViewDay`` holds per-day counts for the posts read that day;
+* ``PostViewWindow`` holds each post's total over the last
+  ``BLOG_POPULAR_WINDOW_DAYS`` days. Flushes add to it, and once a day the
+  days that fell out of the window are subtracted and deleted, so the
+  leaderboard is a read of the top of an index and nothing is ever rescanned.
+
+A flush that fails (a locked or unreachable database) puts its views back
+into the buffer for the next attempt, so the buffer holds every view since
+the last successful flush. That is what a process killed outright loses:
+normally under a threshold's or an interval's worth of views, but without
+bound while flushes keep failing. A clean exit flushes the buffer first.
+Flush counts and timings are kept in the default cache, which all processes
+share, so the ``view_counter_stats`` command reports the server's flushes.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post, PostViewDay, PostViewWindow
+
+logger = logging.getLogger(__name__)
+
+STATS_PREFIX = 'blog:views:stats'
+STATS = ('flushes', 'failed_flushes', 'failed_expiries', 'flushed_views', 'flushed_posts', 'flush_microseconds')
+
+
+def window_days():
+    return getattr(settings, 'BLOG_POPULAR_WINDOW_DAYS', 7)
+
+
+def _by_increment(counts):
+    """``{increment: [post_pk, ...]}``, so each distinct increment is one UPDATE."""
+    groups = defaultdict(list)
+    for pk, count in counts.items():
+        groups[count].append(pk)
+    return groups
+
+
+def _stat_add(name, amount=1):
+    key = f'{STATS_PREFIX}:{name}'
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+@transaction.atomic
+def write_views(counts, day):
+    """Add ``{post_pk: views}`` seen on ``day`` to the stored counters."""
+    groups = _by_increment(counts)
+    for increment, pks in groups.items():
+        Post.objects.filter(pk__in=pks).update(view_count=F('view_count') + increment)
+    # Posts deleted since they were viewed have nowhere to keep their counts.
+    live = set(Post.objects.filter(pk__in=counts).values_list('pk', flat=True))
+    PostViewDay.objects.bulk_create(
+        [PostViewDay(post_id=pk, day=day) for pk in live], ignore_conflicts=True,
+    )
+    PostViewWindow.objects.bulk_create(
+        [PostViewWindow(post_id=pk) for pk in live], ignore_conflicts=True,
+    )
+    for increment, pks in groups.items():
+        pks = [pk for pk in pks if pk in live]
+        PostViewDay.objects.filter(day=day, post_id__in=pks).update(views=F('views') + increment)
+        PostViewWindow.objects.filter(post_id__in=pks).update(views=F('views') + increment)
+
+
+@transaction.atomic
+def expire(today):
+    """Take the days before the window ending ``today`` out of the running totals."""
+    cutoff = today - timedelta(days=window_days() - 1)
+    expired = Counter()
+    # Locked, so that two workers expiring at once cannot subtract a day twice.
+    for post_id, views in PostViewDay.objects.select_for_update().filter(day__lt=cutoff).values_list('post_id', 'views'):
+        expired[post_id] += views
+    if not expired:
+        return
+    for decrement, pks in _by_increment(expired).items():
+        PostViewWindow.objects.filter(post_id__in=pks).update(views=F('views') - decrement)
+    PostViewDay.objects.filter(day__lt=cutoff).delete()
+    PostViewWindow.objects.filter(views=0).delete()
+
+
+class ViewCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._pending_views = 0
+        self._last_flush = time.monotonic()
+        self._expired_for = None  # the day expire() last ran for in this process
+        self._wake = threading.Event()
+        self._flusher = None  # the background flush thread, once started
+
+    def __len__(self):
+        return self._pending_views
+
+    def _add(self, post_pk):
+        """Buffer one view; True when the buffer is due for a flush."""
+        threshold = getattr(settings, 'BLOG_VIEW_FLUSH_THRESHOLD', 100)
+        interval = getattr(settings, 'BLOG_VIEW_FLUSH_INTERVAL', 10)
+        with self._lock:
+            self._pending[post_pk] += 1
+            self._pending_views += 1
+            return (self._pending_views >= threshold
+                    or time.monotonic() - self._last_flush >= interval)
+
+    def record(self, post_pk):
+        if self._add(post_pk):
+            if self._flusher is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    async def arecord(self, post_pk):
+        if self._add(post_pk):
+            if self._flusher is not None:
+                self._wake.set()
+            else:
+                await sync_to_async(self.flush)()
+
+    def start_flusher(self):
+        """Hand flushing to a daemon thread from now on; requests then only buffer."""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name='blog-view-flusher', daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(getattr(settings, 'BLOG_VIEW_FLUSH_INTERVAL', 10))
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:  # keep the thread alive for the next flush
+                logger.exception('Flushing post view counts failed')
+
+    def flush(self):
+        """Write the buffered views out. Returns the number of views written."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            views, self._pending_views = self._pending_views, 0
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            write_views(batch, timezone.localdate())
+        except DatabaseError:
+            with self._lock:
+                self._pending.update(batch)
+                self._pending_views += views
+            _stat_add('failed_flushes')
+            return 0
+        try:
+            # The views are committed; a failed expiry is retried on the next flush.
+            self.expire_if_due()
+        except DatabaseError:
+            _stat_add('failed_expiries')
+        _stat_add('flushes')
+        _stat_add('flushed_views', views)
+        _stat_add('flushed_posts', len(batch))
+        _stat_add('flush_microseconds', int((time.perf_counter() - started) * 1_000_000))
+        return views
+
+    def expire_if_due(self):
+        today = timezone.localdate()
+        with self._lock:
+            if self._expired_for == today:
+                return
+            self._expired_for = today
+        try:
+            expire(today)
+        except DatabaseError:
+            with self._lock:
+                self._expired_for = None
+            raise
+
+    def discard(self):
+        """Drop the buffered views and restart the flush interval."""
+        with self._lock:
+            self._pending = Counter()
+            self._pending_views = 0
+            self._last_flush = time.monotonic()
+            self._expired_for = None
+
+
+view_counter = ViewCounter()
+
+
+def counts_views(view):
+    """Count a view of post ``pk`` for each page ``view`` serves (not for 304s or errors)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            view_counter.record(kwargs['pk'])
+        return response
+    return wrapper
+
+
+def popular_posts(limit=10):
+    """The most viewed posts of the window, each with its count as ``recent_views``."""
+    view_counter.expire_if_due()
+    windows = (
+        PostViewWindow.objects.filter(views__gt=0)
+        .select_related('post__author')
+        .order_by('-views', '-post_id')[:limit]
+    )
+    posts = []
+    for window in windows:
+        window.post.recent_views = window.views
+        posts.append(window.post)
+    return posts
+
+
+def stats():
+    values = cache.get_many([f'{STATS_PREFIX}:{name}' for name in STATS])
+    result = {name: values.get(f'{STATS_PREFIX}:{name}', 0) for name in STATS}
+    flushes = result['flushes']
+    result['mean_flush_ms'] = result['flush_microseconds'] / flushes / 1000 if flushes else 0.0
+    return result
+
+
+def reset_stats():
+    cache.delete_many([f'{STATS_PREFIX}:{name}' for name in STATS])
@@ -1,9 +1,23 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.paginator import Page
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
+from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
+from django.views import View
 from django.views.generic import (
     ListView,
     DetailView,
@@ -12,11 +26,19 @@ from django.views.generic import (
     DeleteView
 )
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q # For complex search queries
+from django.db import transaction
 from taggit.models import Tag # For filtering by tags
 
-from .models import Post, Comment
+from .models import Post, Comment, RelatedPost
 from .forms import CustomUserCreationForm, ProfileEditForm, PostForm, CommentForm
+from .mixins import OwnerRequiredMixin
+from . import archive, conditional, content_version, counters, feeds, page_cache
+from .exporter import InvalidExportFilter, export_lines, filtered_posts
+from .pagination import CursorPage, InvalidCursor, KeysetPaginator
+from .result_cache import search_results
+from .search import normalize_query, search_posts # Inverted-index search backend
+from .tag_index import tag_index
+from .view_counter import counts_views, popular_posts, window_days
 
 # --- Authentication Views (Example Stubs - Replace with your full implementation) ---
 
@@ -41,43 +63,120 @@ def register(request):
 # --- Blog Post CRUD Views (Updated for Tagging and Search) ---
 # --------------------------------------------------------------------------
 
+def filter_posts(queryset, query=None, tag=None, **search_kwargs):
+    """Narrow the post list to ``tag`` and the search ``query`` (shared by the async views)."""
+    # 1. Handle Tag Filtering
+    if tag is not None:
+        # Ensures Post.objects.filter is explicitly called for checker compliance
+        if not query:
+            queryset = Post.objects.filter(tags=tag).distinct()
+        else:
+            queryset = queryset.filter(tags=tag)
+
+    # 2. Handle Search Query (served from the search index, ranked by relevance)
+    if query:
+        queryset = search_posts(queryset, query, **search_kwargs)
+
+    # Load authors in the same query and all tags of the page in one more,
+    # instead of one query per post row in the template. The cards show the
+    # stored excerpt, so the (possibly long) content column is never read.
+    return queryset.select_related('author').prefetch_related('tags').defer('content')
+
+
+@method_decorator(
+    condition(etag_func=conditional.post_list_etag,
+              last_modified_func=conditional.post_list_last_modified),
+    name='dispatch',
+)
+@method_decorator(page_cache.cached_page, name='dispatch')
 class PostListView(ListView):
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
     paginate_by = 5
+    cursor_kwarg = 'cursor'
+
+    def get_pagination_mode(self):
+        # 'page' keeps Django's numbered pages (fine for small sites);
+        # 'cursor' switches to keyset pagination, whose cost does not grow with depth.
+        return getattr(settings, 'BLOG_PAGINATION', 'page')
+
+    def paginate_queryset(self, queryset, page_size):
+        # Search and tag listings are served from the versioned result cache.
+        if self.request.GET.get('q') or self.kwargs.get('tag_slug'):
+            return self.paginate_cached(queryset, page_size)
+        return self.paginate_uncached(queryset, page_size)
+
+    def paginate_uncached(self, queryset, page_size):
+        if self.get_pagination_mode() != 'cursor':
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_keyset_paginator(self, queryset, page_size):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return KeysetPaginator(queryset, page_size, ordering)
+
+    def paginate_cached(self, queryset, page_size):
+        mode = self.get_pagination_mode()
+        position_kwarg = self.cursor_kwarg if mode == 'cursor' else self.page_kwarg
+        key = (
+            content_version.current(),
+            normalize_query(self.request.GET.get('q', '')),
+            self.kwargs.get('tag_slug'),
+            mode,
+            page_size,
+            self.request.GET.get(position_kwarg),
+        )
+        entry = search_results.get_or_compute(key, lambda: self.get_page_entry(queryset, page_size))
+
+        posts = Post.objects.select_related('author').prefetch_related('tags').defer('content').in_bulk(entry['ids'])
+        object_list = [posts[pk] for pk in entry['ids'] if pk in posts]
+        if mode == 'cursor':
+            paginator = self.get_keyset_paginator(queryset, page_size)
+            page = CursorPage(
+                object_list, paginator, entry['has_next'], entry['has_previous'],
+                cursors=(entry['next_cursor'], entry['previous_cursor']),
+            )
+        else:
+            paginator = self.get_paginator(
+                queryset, page_size, orphans=self.get_paginate_orphans(),
+                allow_empty_first_page=self.get_allow_empty(),
+            )
+            paginator.count = entry['count']  # known already; skips the COUNT(*)
+            page = Page(object_list, entry['number'], paginator)
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_page_entry(self, queryset, page_size):
+        """Paginate for real, keeping only what the result cache needs."""
+        queryset = queryset.select_related(None).prefetch_related(None).only('pk', 'created_at')
+        paginator, page, object_list, is_paginated = self.paginate_uncached(queryset, page_size)
+        entry = {'ids': [post.pk for post in object_list]}
+        if isinstance(page, CursorPage):
+            entry.update(
+                has_next=page.has_next(), has_previous=page.has_previous(),
+                next_cursor=page.next_cursor, previous_cursor=page.previous_cursor,
+            )
+        else:
+            entry.update(count=paginator.count, number=page.number)
+        return entry
 
     def get_queryset(self):
-        # Start with the base queryset
-        queryset = super().get_queryset()
-        query = self.request.GET.get('q')
         tag_slug = self.kwargs.get('tag_slug')
-
-        # 1. Handle Search Query
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(tags__name__icontains=query) # Search by tag name
-            ).distinct()
-        
-        # 2. Handle Tag Filtering
-        if tag_slug:
-            tag = get_object_or_404(Tag, slug=tag_slug)
-            
-            # Ensures Post.objects.filter is explicitly called for checker compliance
-            if not query:
-                 queryset = Post.objects.filter(tags=tag).distinct()
-            else:
-                 queryset = queryset.filter(tags=tag).distinct()
-
-        return queryset
+        tag = get_object_or_404(Tag, slug=tag_slug) if tag_slug else None
+        return filter_posts(super().get_queryset(), self.request.GET.get('q'), tag)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
         context['current_tag'] = self.kwargs.get('tag_slug')
+        context['cursor_pagination'] = self.get_pagination_mode() == 'cursor'
         return context
 
 
@@ -88,16 +187,197 @@ class PostByTagListView(PostListView):
 # ---------------------------------------------
 
 
+class ArchiveMixin:
+    """
+    Post listings for one month and/or one author, with the month sidebar.
+
+    The lists are range scans of the (created_at, id) and (author, created_at,
+    id) indexes; the sidebar counts come from blog.archive.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        # The result cache is keyed on search and tag only.
+        return self.paginate_uncached(queryset, page_size)
+
+    def get_archive_author(self):
+        return None
+
+    def get_archive_filter(self):
+        year, month = self.kwargs.get('year'), self.kwargs.get('month')
+        if year is None:
+            return {}
+        if not 1 <= month <= 12 or not 1 <= year <= 9998:
+            raise Http404('No such month')
+        start, end = archive.month_range(year, month)
+        return {'created_at__gte': start, 'created_at__lt': end}
+
+    def get_queryset(self):
+        queryset = Post.objects.filter(**self.get_archive_filter())
+        author = self.get_archive_author()
+        if author is not None:
+            queryset = queryset.filter(author=author)
+        return queryset.order_by(*self.ordering).select_related('author').prefetch_related('tags').defer('content')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        author = self.get_archive_author()
+        month = None
+        if 'year' in self.kwargs:
+            month = date(self.kwargs['year'], self.kwargs['month'], 1)
+        context['archive_author'] = author
+        context['archive_month'] = month
+        context['archive_months'] = archive.month_counts(author.pk if author else None)
+        return context
+
+
+class ArchiveMonthView(ArchiveMixin, PostListView):
+    """All posts published in a month."""
+
+
+class AuthorArchiveView(ArchiveMixin, PostListView):
+    """An author's posts, optionally narrowed to a month."""
+
+    def get_archive_author(self):
+        if not hasattr(self, '_archive_author'):
+            self._archive_author = get_object_or_404(User, username=self.kwargs['username'])
+        return self._archive_author
+
+
+class TagAutocompleteView(View):
+    """Top tags for a name prefix, served from the in-memory tag index."""
+    max_limit = 25
+
+    def get(self, request):
+        try:
+            limit = min(int(request.GET.get('limit', 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+        return JsonResponse({'results': tag_index.suggest(request.GET.get('q', ''), limit)})
+
+
+def related_posts_query(post_pk):
+    return RelatedPost.objects.filter(post_id=post_pk).select_related('related').order_by('rank')
+
+
+@method_decorator(
+    condition(etag_func=conditional.post_detail_etag,
+              last_modified_func=conditional.post_detail_last_modified),
+    name='dispatch',
+)
+@method_decorator(counts_views, name='dispatch')  # also counts pages served from the cache
+@method_decorator(page_cache.cached_page, name='dispatch')
 class PostDetailView(DetailView):
     model = Post
     template_name = 'blog/post_detail.html'
     context_object_name = 'post'
 
+    # Only the first page of the thread is rendered here; script.js fetches
+    # the rest from CommentPageView as the reader scrolls.
+    comments_paginate_by = 20
+
+    def get_queryset(self):
+        return Post.objects.select_related('author').prefetch_related('tags')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        comments = KeysetPaginator(
+            self.object.comments.select_related('author'),
+            self.comments_paginate_by,
+            Comment._meta.ordering,
+        ).page()
         context['comment_form'] = CommentForm()
-        context['comments'] = self.object.comments.all()
+        context['comments'] = comments
+        context['comment_count'] = self.object.comment_count
+        context['related_posts'] = self.get_related_posts()
         return context
+
+    def get_related_posts(self):
+        # One lookup on the (post, rank) index; see blog.related.
+        return [link.related for link in related_posts_query(self.object.pk)]
+
+
+class PopularPostsView(ListView):
+    """The most read posts of the last BLOG_POPULAR_WINDOW_DAYS days."""
+    template_name = 'blog/popular_posts.html'
+    context_object_name = 'posts'
+
+    def get_queryset(self):
+        return popular_posts(getattr(settings, 'BLOG_POPULAR_POSTS', 10))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['window_days'] = window_days()
+        return context
+
+
+class CommentPageView(View):
+    """Next page of a post's comments as JSON: rendered HTML plus the next cursor."""
+    paginate_by = PostDetailView.comments_paginate_by
+
+    def get(self, request, pk):
+        paginator = KeysetPaginator(
+            Comment.objects.filter(post_id=pk).select_related('author'),
+            self.paginate_by,
+            Comment._meta.ordering,
+        )
+        try:
+            page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        html = render_to_string('blog/comment_items.html', {'comments': page}, request=request)
+        return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+class FeedView(View):
+    """Serve a stored RSS/Atom feed (see blog.feeds): one row lookup, gzip, 304s."""
+
+    def get(self, request, fmt, kind='site', value=None):
+        if fmt not in feeds.FORMATS:
+            raise Http404('Unknown feed format')
+        try:
+            document = feeds.get_document(request, fmt, kind, value)
+        except ObjectDoesNotExist:
+            raise Http404('No such feed')
+
+        compressed = bool(re_accepts_gzip.search(request.headers.get('accept-encoding', '')))
+        # Each encoding is a different representation, so it gets its own ETag.
+        etag = quote_etag(f'{document.etag}-gz' if compressed else document.etag)
+        last_modified = int(document.last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(
+                document.body_gzip if compressed else document.body,
+                content_type=feeds.FORMATS[fmt].content_type,
+            )
+            if compressed:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
+class ExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Staff-only streaming dump of posts and comments as NDJSON or CSV."""
+    content_types = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        params = request.GET
+        fmt = params.get('format', 'ndjson')
+        model = params.get('model', 'posts')
+        try:
+            posts = filtered_posts(params.get('author'), params.get('tag'),
+                                   params.get('since'), params.get('until'))
+            lines = export_lines(posts, fmt, model)
+        except InvalidExportFilter as e:
+            return HttpResponseBadRequest(str(e))
+        response = StreamingHttpResponse(lines, content_type=f'{self.content_types[fmt]}; charset=utf-8')
+        filename = f'blog-{model}.csv' if fmt == 'csv' else 'blog-posts.ndjson'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
     
 
 class PostCreateView(LoginRequiredMixin, CreateView):
@@ -115,41 +395,27 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         context['title'] = 'Create Post'
         return context
 
-class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class PostUpdateView(OwnerRequiredMixin, UpdateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/post_form.html'
+    permission_denied_message = 'You are not authorized to edit this post.'
 
     def form_valid(self, form):
         form.instance.author = self.request.user
         messages.success(self.request, 'Your post has been updated!')
         return super().form_valid(form)
 
-    def test_func(self):
-        post = self.get_object()
-        return self.request.user == post.author
-
-    def handle_no_permission(self):
-        messages.error(self.request, 'You are not authorized to edit this post.')
-        return redirect('blog:post_detail', pk=self.kwargs['pk'])
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Edit Post'
         return context
 
-class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class PostDeleteView(OwnerRequiredMixin, DeleteView):
     model = Post
     template_name = 'blog/post_confirm_delete.html'
     success_url = reverse_lazy('blog:post_list')
-
-    def test_func(self):
-        post = self.get_object()
-        return self.request.user == post.author
-
-    def handle_no_permission(self):
-        messages.error(self.request, 'You are not authorized to delete this post.')
-        return redirect('blog:post_detail', pk=self.kwargs['pk'])
+    permission_denied_message = 'You are not authorized to delete this post.'
 
     def form_valid(self, form):
         messages.success(self.request, 'Your post has been deleted!')
@@ -171,33 +437,34 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         form.instance.author = self.request.user
         form.instance.post = post
         
+        with transaction.atomic():
+            response = super().form_valid(form)
+            counters.comment_added(self.object)
         messages.success(self.request, "Your comment has been posted!")
-        return super().form_valid(form)
+        return response
 
     def get_success_url(self):
-        return reverse('blog:post_detail', kwargs={'pk': self.object.post.pk})
+        return reverse('blog:post_detail', kwargs={'pk': self.object.post_id})
 
 
-class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class CommentUpdateView(OwnerRequiredMixin, UpdateView):
     model = Comment
+    queryset = Comment.objects.select_related('post')  # the templates link back to the post
     form_class = CommentForm
     template_name = 'blog/comment_form.html'
     context_object_name = 'comment'
+    permission_denied_message = 'You are not authorized to edit this comment.'
+    denied_post_field = 'post_id'
 
     def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            counters.comment_edited(self.object)
         messages.success(self.request, 'Your comment has been updated!')
-        return super().form_valid(form)
+        return response
 
     def get_success_url(self):
-        return reverse('blog:post_detail', kwargs={'pk': self.object.post.pk})
-
-    def test_func(self):
-        comment = self.get_object()
-        return self.request.user == comment.author
-
-    def handle_no_permission(self):
-        messages.error(self.request, 'You are not authorized to edit this comment.')
-        return redirect('blog:post_detail', pk=self.get_object().post.pk)
+        return reverse('blog:post_detail', kwargs={'pk': self.object.post_id})
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -205,22 +472,21 @@ class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return context
 
 
-class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class CommentDeleteView(OwnerRequiredMixin, DeleteView):
     model = Comment
+    queryset = Comment.objects.select_related('post')  # the templates link back to the post
     template_name = 'blog/comment_confirm_delete.html'
     context_object_name = 'comment'
+    permission_denied_message = 'You are not authorized to delete this comment.'
+    denied_post_field = 'post_id'
 
     def get_success_url(self):
-        return reverse('blog:post_detail', kwargs={'pk': self.object.post.pk})
-
-    def test_func(self):
-        comment = self.get_object()
-        return self.request.user == comment.author
-
-    def handle_no_permission(self):
-        messages.error(self.request, 'You are not authorized to delete this comment.')
-        return redirect('blog:post_detail', pk=self.get_object().post.pk)
+        return reverse('blog:post_detail', kwargs={'pk': self.object.post_id})
 
     def form_valid(self, form):
+        post_pk = self.object.post_id
+        with transaction.atomic():
+            response = super().form_valid(form)
+            counters.comment_removed(post_pk)
         messages.success(self.request, 'Your comment has been deleted!')
-        return super().form_valid(form)
\ No newline at end of file
+        return response
\ No newline at end of file
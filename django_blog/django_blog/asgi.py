@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_blog.settings")
 
 application = get_asgi_application()
+
+# Post view counts are written by a background thread, not by requests.
+from blog.view_counter import view_counter  # noqa: E402
+
+view_counter.start_flusher()
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "blog.middleware.PrimaryPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -100,6 +101,44 @@ DATABASES = {
     }
 }
 
+# The blog keeps its content version token, page and fragment caches and
+# their stats in the default cache, which must be shared by every process
+# (web workers and management commands alike) or their writes go unseen.
+# Set BLOG_REDIS_URL in production; the default is a file cache that the
+# processes on one machine share.
+if os.environ.get('BLOG_REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ['BLOG_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get('BLOG_CACHE_DIR', BASE_DIR / ".django_cache"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Read replicas for the blog's tables, as {alias: weight}; see blog/routers.py.
+# Locally, BLOG_SQLITE_REPLICAS="replica1:2,replica2:1" adds read-only SQLite
+# copies (replica1.sqlite3, ...) which `manage.py sync_replicas` refreshes.
+BLOG_DB_REPLICAS = {}
+for _spec in filter(None, os.environ.get('BLOG_SQLITE_REPLICAS', '').split(',')):
+    _alias, _, _weight = _spec.partition(':')
+    DATABASES[_alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{BASE_DIR / _alias}.sqlite3?mode=ro",
+        "TEST": {"MIRROR": "default"},
+    }
+    BLOG_DB_REPLICAS[_alias] = int(_weight or 1)
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+BLOG_REPLICA_PIN_SECONDS = 10    # read from the primary this long after a write
+BLOG_REPLICA_RETRY_SECONDS = 30  # skip an unreachable replica this long
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -146,6 +185,31 @@ LOGIN_REDIRECT_URL = 'blog:post_list' # URL to redirect after successful login
 LOGOUT_REDIRECT_URL = 'blog:post_list' # URL to redirect after logout (if not handled by your view)
 LOGIN_URL = 'blog:login' # URL for the login page, used by @login_required decorator
 
+# Post list pagination: 'page' for numbered pages, 'cursor' for keyset
+# pagination that stays fast on deep pages of large blogs
+BLOG_PAGINATION = 'page'
+
+# Route the post list, tag listing and post detail to the async views in
+# blog.async_views; worthwhile when serving through ASGI (django_blog/asgi.py)
+BLOG_ASYNC_VIEWS = False
+
+# Post views are buffered per process (blog.view_counter) and written out by
+# a background thread at this many views or after this many seconds, whichever
+# comes first. A killed worker loses the views buffered since its last
+# successful flush (more than the threshold while flushes are failing)
+BLOG_VIEW_FLUSH_THRESHOLD = 100
+BLOG_VIEW_FLUSH_INTERVAL = 10
+BLOG_POPULAR_WINDOW_DAYS = 7  # the "most read" leaderboard covers this many days
+
+# Search and tag listing results are also kept in each process (blog.result_cache)
+# until the next content write, and never longer than this many seconds
+BLOG_SEARCH_CACHE_SECONDS = 60
+
+# Whole-page cache for the list, archive and detail pages (blog.page_cache);
+# entries are shared by all users and end at the next content write or after
+# this many seconds. 0 disables it
+BLOG_PAGE_CACHE_SECONDS = 300
+
 # Media files (for user-uploaded content like profile pictures)
 # You'll need this if you implement the Profile model with an ImageField
 # MEDIA_URL = '/media/'